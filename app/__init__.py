@@ -3,17 +3,29 @@ from flask_sqlalchemy import SQLAlchemy
 from celery import Celery
 import os
 
+from .utils.db_tuning import init_sqlite_pragmas
+from .utils.idempotency import init_idempotency
+from .utils.assets import init_assets
+from .utils.compression import init_compression
+from .utils.label_sheet import init_label_sheets
+from .utils.qr_images import init_qr_images
+
 # 创建扩展实例
 db = SQLAlchemy()
-celery = Celery()
+celery = Celery(__name__, include=['app.tasks'])
+
 
+def create_app(config_overrides=None):
+    """应用工厂函数
 
-def create_app():
-    """应用工厂函数"""
+    config_overrides 用于在初始化扩展之前覆盖配置（例如测试时使用内存数据库和eager模式的Celery）
+    """
     app = Flask(__name__)
 
     # 加载配置
     app.config.from_pyfile('../config.py')
+    if config_overrides:
+        app.config.update(config_overrides)
 
     # 确保实例目录存在
     os.makedirs(app.instance_path, exist_ok=True)
@@ -21,7 +33,13 @@ def create_app():
 
     # 初始化扩展
     db.init_app(app)
-    celery.conf.update(app.config)
+    init_sqlite_pragmas(app, db)
+    init_celery(app)
+    init_idempotency(app)
+    init_assets(app)
+    init_compression(app)
+    init_qr_images(app)
+    init_label_sheets(app)
 
     # 注册蓝图
     from .routes import main_bp
@@ -30,9 +48,40 @@ def create_app():
     # 创建数据库表
     with app.app_context():
         db.create_all()
+        models.ensure_columns()
+        models.ensure_indexes()
+        models.ensure_short_codes()
+
+    # 物资状态缓存（依赖库存版本表，需在建表之后）及基于库存版本的条件请求
+    from .utils.material_cache import init_material_cache
+    from .utils.page_cache import init_page_cache
+    from .utils.material_events import init_material_events
+    from .utils.conditional import init_conditional
+    from .utils.qr_jobs import init_qr_jobs
+    init_material_cache(app)
+    init_page_cache(app)
+    init_material_events(app)
+    init_conditional(app)
+    init_qr_jobs(app)
 
     return app
 
 
+def init_celery(app):
+    """根据Flask配置初始化Celery
+
+    CELERY_TASK_ALWAYS_EAGER 为 True 时任务在当前进程内同步执行，配合 memory:// 代理即可在没有Redis的环境（如测试）中运行
+    """
+    celery.conf.update(
+        broker_url=app.config['CELERY_BROKER_URL'],
+        result_backend=app.config['CELERY_RESULT_BACKEND'],
+        timezone=app.config['CELERY_TIMEZONE'],
+        task_always_eager=app.config.get('CELERY_TASK_ALWAYS_EAGER', False),
+        task_ignore_result=True,
+        broker_connection_timeout=app.config.get('CELERY_BROKER_CONNECTION_TIMEOUT', 3),
+    )
+    return celery
+
+
 # 导入模型（必须在db初始化后）
-from . import models
\ No newline at end of file
+from . import models
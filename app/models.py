@@ -1,5 +1,12 @@
 from . import db
 from datetime import datetime
+import logging
+import secrets
+
+from sqlalchemy import event, inspect, select, text, update
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
 
 
 class Material(db.Model):
@@ -8,11 +15,13 @@ class Material(db.Model):
     name = db.Column(db.String(100), nullable=False, comment='物资名称')
     description = db.Column(db.Text, comment='物资描述')
     qr_code = db.Column(db.String(100), unique=True, comment='二维码文件名')
-    category = db.Column(db.String(50), default='其他', comment='分类')
-    status = db.Column(db.String(20), default='available', comment='状态: available/borrowed/maintenance')
+    qr_hash = db.Column(db.String(64), comment='二维码内容哈希（地址+渲染参数）')
+    short_code = db.Column(db.String(16), unique=True, index=True, comment='二维码短码（/s/<短码>），生成后不再变化')
+    category = db.Column(db.String(50), default='其他', index=True, comment='分类')
+    status = db.Column(db.String(20), default='available', index=True, comment='状态: available/borrowed/maintenance')
     current_holder = db.Column(db.String(50), comment='当前持有人')
     borrow_time = db.Column(db.DateTime, comment='借用时间')
-    expected_return = db.Column(db.DateTime, comment='预计归还时间')
+    expected_return = db.Column(db.DateTime, index=True, comment='预计归还时间')
     created_at = db.Column(db.DateTime, default=datetime.now)
 
     def to_dict(self):
@@ -20,6 +29,7 @@ class Material(db.Model):
         return {
             'id': self.id,
             'name': self.name,
+            'qr_code': self.qr_code,
             'category': self.category,
             'status': self.status,
             'current_holder': self.current_holder,
@@ -31,13 +41,48 @@ class Material(db.Model):
         return f'<Material {self.name}>'
 
 
+# 短码字符：QR字母数字模式可编码的大写字母和数字，去掉易混淆的 0/O、1/I
+SHORT_CODE_ALPHABET = '23456789ABCDEFGHJKLMNPQRSTUVWXYZ'
+SHORT_CODE_LENGTH = 6
+
+
+def generate_short_code(connection, taken=()):
+    """生成一个未被使用的随机短码（taken 为本次已分配、尚未写入数据库的短码）"""
+    while True:
+        code = ''.join(secrets.choice(SHORT_CODE_ALPHABET) for _ in range(SHORT_CODE_LENGTH))
+        if code in taken:
+            continue
+        exists = connection.execute(select(Material.id).where(Material.short_code == code)).first()
+        if exists is None:
+            return code
+
+
+@event.listens_for(Material, 'before_insert')
+def _assign_short_code(mapper, connection, target):
+    """新物资入库时分配短码"""
+    if not target.short_code:
+        target.short_code = generate_short_code(connection)
+
+
 class BorrowRecord(db.Model):
     """借用记录模型"""
+    __table_args__ = (
+        # 归还、管理员改状态时按 (material_id, status) 查找未归还记录
+        db.Index('ix_borrow_record_material_status', 'material_id', 'status'),
+        # 每件物资最多只有一条未归还的借用记录
+        db.Index(
+            'uq_borrow_record_open_material', 'material_id',
+            unique=True,
+            sqlite_where=text("status = 'borrowed'"),
+            postgresql_where=text("status = 'borrowed'")
+        ),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     material_id = db.Column(db.Integer, db.ForeignKey('material.id'), nullable=False)
     borrower = db.Column(db.String(50), nullable=False, comment='借用人')
     student_id = db.Column(db.String(20), comment='学号')
-    borrow_time = db.Column(db.DateTime, default=datetime.now, comment='借用时间')
+    borrow_time = db.Column(db.DateTime, default=datetime.now, index=True, comment='借用时间')
     return_time = db.Column(db.DateTime, comment='归还时间')
     status = db.Column(db.String(20), default='borrowed', comment='状态: borrowed/returned')
 
@@ -45,4 +90,83 @@ class BorrowRecord(db.Model):
     material = db.relationship('Material', backref=db.backref('borrow_records', lazy=True))
 
     def __repr__(self):
-        return f'<BorrowRecord {self.borrower} - {self.material_id}>'
\ No newline at end of file
+        return f'<BorrowRecord {self.borrower} - {self.material_id}>'
+
+
+class InventoryState(db.Model):
+    """库存版本（单行表）：物资状态每次变化都递增，多个worker据此让各自的缓存失效"""
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0, comment='库存版本号')
+    updated_at = db.Column(db.DateTime, default=datetime.now, comment='最后变化时间')
+
+
+INVENTORY_STATE_ID = 1
+
+
+def bump_inventory_version(connection=None):
+    """在当前事务中递增库存版本，返回新版本号"""
+    connection = connection or db.session
+    connection.execute(
+        update(InventoryState)
+        .where(InventoryState.id == INVENTORY_STATE_ID)
+        .values(version=InventoryState.version + 1, updated_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+    return connection.execute(
+        select(InventoryState.version).where(InventoryState.id == INVENTORY_STATE_ID)
+    ).scalar()
+
+
+def ensure_inventory_state():
+    """确保库存版本行存在"""
+    if not db.session.get(InventoryState, INVENTORY_STATE_ID):
+        db.session.add(InventoryState(id=INVENTORY_STATE_ID, version=0))
+        db.session.commit()
+
+
+@event.listens_for(db.session, 'after_flush')
+def _bump_version_on_material_flush(session, flush_context):
+    """通过ORM增删改物资（初始化脚本、后台修改等）时同样递增库存版本"""
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    if any(isinstance(obj, Material) for obj in changed):
+        bump_inventory_version(session.connection())
+
+
+def ensure_indexes():
+    """为已存在的数据库补建索引（db.create_all 不会给已有的表新增索引）"""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(db.engine, checkfirst=True)
+            except SQLAlchemyError as e:
+                # 历史数据中同一物资存在多条未归还记录时，唯一索引无法创建
+                logger.warning(f"⚠️ 索引 {index.name} 创建失败，请先清理重复数据: {e}")
+
+
+def ensure_columns():
+    """为已存在的表补加新增的列（db.create_all 不会修改已有的表，新增列须可为空）"""
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as connection:
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            logger.info(f"✅ 已为表 {table.name} 添加列 {column.name}")
+
+
+def ensure_short_codes():
+    """为新增短码列之前创建的物资补发短码"""
+    materials = Material.query.filter(Material.short_code.is_(None)).all()
+    if not materials:
+        return
+    # 直接用连接查重，避免每次查询都触发autoflush
+    connection = db.session.connection()
+    taken = set()
+    for material in materials:
+        material.short_code = generate_short_code(connection, taken)
+        taken.add(material.short_code)
+    db.session.commit()
+    logger.info(f"✅ 已为 {len(materials)} 个物资分配二维码短码")
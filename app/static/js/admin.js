@@ -0,0 +1,109 @@
+const grid = document.getElementById('materials-grid');
+const loadMore = document.getElementById('load-more');
+const cardTemplate = document.getElementById('card-template');
+const pageParams = new URLSearchParams(JSON.parse(grid.dataset.pageParams));
+let loading = false;
+
+function formatTime(value) {
+    return value ? value.slice(0, 16).replace('T', ' ') : '无';
+}
+
+// 用物资数据填充卡片：新加载的卡片和推送的状态变化共用
+function fillCard(card, material) {
+    const available = material.status === 'available';
+    card.dataset.id = material.id;
+    card.classList.toggle('available', available);
+    card.classList.toggle('borrowed', !available);
+    card.querySelector('.material-name').textContent = material.name;
+    card.querySelector('.material-id').textContent = '#' + material.id;
+
+    const badge = card.querySelector('.status-badge');
+    badge.className = 'status-badge ' + (available ? 'status-available' : 'status-borrowed');
+    badge.textContent = available ? '🟢 可借用' : '🔴 已借出';
+
+    card.querySelector('[data-field="category"]').textContent = material.category;
+    card.querySelector('[data-field="current_holder"]').textContent = material.current_holder || '无';
+    card.querySelector('[data-field="borrow_time"]').textContent = formatTime(material.borrow_time);
+    card.querySelector('.qr-btn').href = '/qr/' + material.id + '.png';
+    card.querySelector('.borrow-btn').href = '/borrow/' + material.id;
+}
+
+function renderCard(material, index) {
+    const card = cardTemplate.content.firstElementChild.cloneNode(true);
+    card.style.animationDelay = (index * 100) % 600 + 'ms';
+    fillCard(card, material);
+    return card;
+}
+
+async function loadNextPage() {
+    const cursor = loadMore.dataset.nextCursor;
+    if (loading || !cursor) return;
+    loading = true;
+    loadMore.textContent = '加载中...';
+
+    try {
+        pageParams.set('cursor', cursor);
+        const response = await fetch('/api/materials?' + pageParams);
+        const result = await response.json();
+        if (!response.ok) throw new Error(result.error);
+
+        const fragment = document.createDocumentFragment();
+        result.data.forEach((material, index) => fragment.appendChild(renderCard(material, index)));
+        grid.appendChild(fragment);
+
+        loadMore.dataset.nextCursor = result.next_cursor || '';
+        loadMore.hidden = !result.next_cursor;
+        loadMore.textContent = '加载更多';
+    } catch (error) {
+        loadMore.textContent = '加载失败，点击重试';
+    } finally {
+        loading = false;
+    }
+}
+
+loadMore.addEventListener('click', loadNextPage);
+if ('IntersectionObserver' in window) {
+    new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) loadNextPage();
+    }, {rootMargin: '400px'}).observe(loadMore);
+}
+
+// 点击波纹效果：在列表容器上统一处理，新加载的卡片无需单独绑定
+grid.addEventListener('click', function(e) {
+    const card = e.target.closest('.material-card');
+    if (!card) return;
+
+    const ripple = document.createElement('div');
+    ripple.style.position = 'absolute';
+    ripple.style.borderRadius = '50%';
+    ripple.style.backgroundColor = 'rgba(102, 126, 234, 0.3)';
+    ripple.style.transform = 'scale(0)';
+    ripple.style.animation = 'ripple 0.6s linear';
+    ripple.style.pointerEvents = 'none';
+
+    const rect = card.getBoundingClientRect();
+    const size = Math.max(rect.width, rect.height);
+    ripple.style.width = ripple.style.height = size + 'px';
+    ripple.style.left = e.clientX - rect.left - size/2 + 'px';
+    ripple.style.top = e.clientY - rect.top - size/2 + 'px';
+
+    card.appendChild(ripple);
+    setTimeout(() => {
+        ripple.remove();
+    }, 600);
+});
+
+// 其他人借用/归还后就地更新对应卡片和统计数字
+subscribeMaterialEvents(grid.dataset.version, event => {
+    event.materials.forEach(material => {
+        const card = grid.querySelector(`.material-card[data-id="${material.id}"]`);
+        if (card) fillCard(card, material);
+    });
+    event.removed.forEach(id => {
+        const card = grid.querySelector(`.material-card[data-id="${id}"]`);
+        if (card) card.remove();
+    });
+    document.getElementById('total-count').textContent = event.counts.total;
+    document.getElementById('available-count').textContent = event.counts.available;
+    document.getElementById('borrowed-count').textContent = event.counts.borrowed;
+});
@@ -0,0 +1,59 @@
+// 同一次借用的重试/连点共用一个幂等键，服务端只处理一次
+const idempotencyKey = Date.now().toString(36) + Math.random().toString(36).slice(2);
+
+const form = document.getElementById('borrowForm');
+
+form.addEventListener('submit', async (e) => {
+    e.preventDefault();
+
+    const borrower = document.getElementById('borrower').value.trim();
+    const studentId = document.getElementById('student_id').value.trim();
+    const submitBtn = document.getElementById('submitBtn');
+    const resultDiv = document.getElementById('result');
+
+    if (!borrower) {
+        resultDiv.className = 'error';
+        resultDiv.innerHTML = '❌ 请输入姓名';
+        return;
+    }
+
+    submitBtn.disabled = true;
+    submitBtn.textContent = '借用中...';
+    resultDiv.innerHTML = '处理中...';
+
+    try {
+        const response = await fetch('/api/borrow/' + form.dataset.materialId, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Idempotency-Key': idempotencyKey
+            },
+            body: JSON.stringify({
+                borrower: borrower,
+                student_id: studentId
+            })
+        });
+
+        const result = await response.json();
+
+        if (result.success) {
+            resultDiv.className = 'success';
+            resultDiv.innerHTML = `
+                ✅ <strong>${result.message}</strong><br>
+                📅 预计归还: ${result.data.expected_return}<br>
+                👤 借用人: ${result.data.borrower}
+            `;
+            form.style.display = 'none';
+        } else {
+            resultDiv.className = 'error';
+            resultDiv.innerHTML = `❌ ${result.error}`;
+            submitBtn.disabled = false;
+            submitBtn.textContent = '确认借用';
+        }
+    } catch (error) {
+        resultDiv.className = 'error';
+        resultDiv.innerHTML = '❌ 网络错误，请重试';
+        submitBtn.disabled = false;
+        submitBtn.textContent = '确认借用';
+    }
+});
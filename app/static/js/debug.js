@@ -0,0 +1,48 @@
+async function updateStatus(materialId, newStatus) {
+    if (!confirm('确定要修改物资状态吗？')) return;
+
+    try {
+        const response = await fetch('/api/admin/update-status', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({
+                material_id: materialId,
+                status: newStatus
+            })
+        });
+
+        const result = await response.json();
+        if (result.success) {
+            // 页面由 /api/events 推送的变化就地更新，无需整页刷新
+            alert('状态更新成功！');
+        } else {
+            alert('更新失败: ' + result.error);
+        }
+    } catch (error) {
+        alert('网络错误: ' + error);
+    }
+}
+
+function formatTime(value) {
+    return value ? value.slice(0, 16).replace('T', ' ') : '无';
+}
+
+function patchMaterial(material) {
+    const item = document.querySelector(`.material-item[data-id="${material.id}"]`);
+    if (!item) return;
+
+    const available = material.status === 'available';
+    item.className = 'material-item ' + material.status;
+    const statusText = item.querySelector('.status-text');
+    statusText.style.color = available ? 'green' : 'red';
+    statusText.textContent = available ? '🟢 可借用' : '🔴 已借出';
+
+    item.querySelector('[data-field="status"]').textContent = material.status;
+    item.querySelector('[data-field="current_holder"]').textContent = material.current_holder || '无';
+    item.querySelector('[data-field="borrow_time"]').textContent = formatTime(material.borrow_time);
+    item.querySelector('[data-field="expected_return"]').textContent = formatTime(material.expected_return);
+}
+
+subscribeMaterialEvents(document.body.dataset.version, event => {
+    event.materials.forEach(patchMaterial);
+});
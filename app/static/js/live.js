@@ -0,0 +1,13 @@
+// 订阅物资状态变化（/api/events），since 为页面渲染时的库存版本
+function subscribeMaterialEvents(since, onChange) {
+    if (!window.EventSource) return null;
+
+    const source = new EventSource('/api/events?since=' + encodeURIComponent(since));
+    source.addEventListener('material', e => onChange(JSON.parse(e.data)));
+    // 离线太久，错过的变化已无法补发，只能整页重新加载
+    source.addEventListener('resync', () => {
+        source.close();
+        location.reload();
+    });
+    return source;
+}
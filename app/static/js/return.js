@@ -0,0 +1,68 @@
+// 同一次归还的重试/连点共用一个幂等键，服务端只处理一次
+const idempotencyKey = Date.now().toString(36) + Math.random().toString(36).slice(2);
+
+const form = document.getElementById('returnForm');
+
+form.addEventListener('submit', async (e) => {
+    e.preventDefault();
+
+    const borrower = document.getElementById('borrower').value.trim();
+    const studentId = document.getElementById('student_id').value.trim();
+    const submitBtn = document.getElementById('submitBtn');
+    const resultDiv = document.getElementById('result');
+
+    if (!borrower || !studentId) {
+        resultDiv.className = 'error';
+        resultDiv.innerHTML = '❌ 请输入完整的姓名和学号';
+        return;
+    }
+
+    submitBtn.disabled = true;
+    submitBtn.innerHTML = '<div class="loading-spinner"></div>验证身份中...';
+    resultDiv.className = 'loading';
+    resultDiv.innerHTML = '正在验证您的身份信息，请稍候...';
+
+    try {
+        const response = await fetch('/api/return/' + form.dataset.materialId, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Idempotency-Key': idempotencyKey
+            },
+            body: JSON.stringify({
+                borrower: borrower,
+                student_id: studentId
+            })
+        });
+
+        const result = await response.json();
+
+        if (result.success) {
+            resultDiv.className = 'success';
+            resultDiv.innerHTML = `
+                <div class="success-icon">🎉</div>
+                <div style="font-size: 18px; margin-bottom: 8px;"><strong>${result.message}</strong></div>
+                <div>归还时间：${result.data.return_time}</div>
+                <div style="margin-top: 15px; font-size: 14px; opacity: 0.8;">感谢您的使用！</div>
+            `;
+            form.style.display = 'none';
+            submitBtn.style.display = 'none';
+        } else {
+            resultDiv.className = 'error';
+            resultDiv.innerHTML = `
+                <div style="font-size: 18px; margin-bottom: 8px;">❌ 操作失败</div>
+                <div>${result.error}</div>
+            `;
+            submitBtn.disabled = false;
+            submitBtn.innerHTML = '✅ 确认归还';
+        }
+    } catch (error) {
+        resultDiv.className = 'error';
+        resultDiv.innerHTML = `
+            <div style="font-size: 18px; margin-bottom: 8px;">❌ 网络错误</div>
+            <div>请检查网络连接后重试</div>
+        `;
+        submitBtn.disabled = false;
+        submitBtn.innerHTML = '✅ 确认归还';
+    }
+});
@@ -0,0 +1,54 @@
+"""
+Celery异步任务
+
+Web进程只负责把任务投递到代理，耗时的飞书HTTPS请求由worker执行：
+    celery -A celery_worker.celery worker --loglevel=info
+"""
+import logging
+from datetime import datetime
+
+from . import celery
+from .utils.feishu_service import feishu_notifier
+
+logger = logging.getLogger(__name__)
+
+
+@celery.task(bind=True, max_retries=3, default_retry_delay=30)
+def send_borrow_notification(self, material_name, borrower, student_id, borrow_time):
+    """发送借用通知，borrow_time 为ISO格式字符串（任务参数需可JSON序列化）"""
+    borrow_time = datetime.fromisoformat(borrow_time)
+    if feishu_notifier.send_borrow_notification(material_name, borrower, student_id, borrow_time):
+        return True
+
+    # 飞书接口失败时稍后重试；eager模式下不重试，避免阻塞当前请求
+    if self.request.is_eager:
+        return False
+    raise self.retry()
+
+
+def notify_borrow(material_name, borrower, student_id, borrow_time):
+    """投递借用通知任务，投递失败不影响借用结果"""
+    try:
+        send_borrow_notification.delay(material_name, borrower, student_id, borrow_time.isoformat())
+    except Exception as e:
+        logger.error(f"⚠️ 飞书通知任务投递失败，但不影响借用: {e}")
+
+
+@celery.task(bind=True, max_retries=3, default_retry_delay=30)
+def send_batch_borrow_notification(self, material_names, borrower, student_id, borrow_time):
+    """发送批量借用的合并通知"""
+    borrow_time = datetime.fromisoformat(borrow_time)
+    if feishu_notifier.send_batch_borrow_notification(material_names, borrower, student_id, borrow_time):
+        return True
+
+    if self.request.is_eager:
+        return False
+    raise self.retry()
+
+
+def notify_batch_borrow(material_names, borrower, student_id, borrow_time):
+    """投递批量借用通知任务，投递失败不影响借用结果"""
+    try:
+        send_batch_borrow_notification.delay(list(material_names), borrower, student_id, borrow_time.isoformat())
+    except Exception as e:
+        logger.error(f"⚠️ 飞书批量通知任务投递失败，但不影响借用: {e}")
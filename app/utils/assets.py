@@ -0,0 +1,58 @@
+"""
+带内容哈希的静态资源（CSS/JS）
+
+模板中用 asset_url('css/admin.css') 生成 /assets/css/admin.<hash>.css，
+文件内容变化时URL随之变化，因此可以设置 Cache-Control: immutable 让浏览器长期缓存，
+扫码打开页面时只需下载很小的HTML。
+"""
+import hashlib
+import os
+
+from flask import current_app, url_for
+
+# 带哈希的URL内容永不变化，缓存一年
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+
+class AssetManifest:
+    """静态目录的文件名 <-> 带哈希文件名 映射，启动时计算一次"""
+
+    def __init__(self, root):
+        self.root = root
+        self._hashed = {}
+        self._sources = {}
+        if not os.path.isdir(root):
+            return
+
+        for dirpath, dirnames, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                with open(path, 'rb') as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()[:10]
+                source = os.path.relpath(path, root).replace(os.sep, '/')
+                base, ext = os.path.splitext(source)
+                hashed = f"{base}.{digest}{ext}"
+                self._hashed[source] = hashed
+                self._sources[hashed] = source
+
+    def hashed_name(self, filename):
+        """css/admin.css -> css/admin.<hash>.css，文件不存在时抛出 KeyError"""
+        return self._hashed[filename]
+
+    def source_name(self, hashed):
+        """带哈希的文件名 -> 静态目录中的文件名，哈希不匹配时返回 None"""
+        return self._sources.get(hashed)
+
+
+def init_assets(app):
+    app.extensions['assets'] = AssetManifest(app.static_folder)
+    app.add_template_global(asset_url)
+
+
+def get_asset_manifest():
+    return current_app.extensions['assets']
+
+
+def asset_url(filename):
+    """模板全局函数：返回静态资源的带哈希URL"""
+    return url_for('main.serve_asset', filename=get_asset_manifest().hashed_name(filename))
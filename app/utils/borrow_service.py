@@ -0,0 +1,278 @@
+"""
+借用/归还的原子操作
+
+物资状态通过带条件的 UPDATE ... WHERE status=? 修改，并检查受影响行数，
+避免"先读取、再判断、后写入"在并发扫码时产生多条未归还的借用记录。
+每次修改都在同一事务中递增库存版本，提交后把新状态写入物资缓存并推送给在线的管理页面。
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from .. import db
+from ..models import Material, BorrowRecord, bump_inventory_version
+from .material_cache import get_material_cache
+from .material_events import get_event_hub
+
+BORROW_DAYS = 7
+
+
+class BorrowError(Exception):
+    """借用/归还失败，message 直接返回给前端"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def _publish(materials, version):
+    """提交后把新状态写入物资缓存，并唤醒 /api/events 的连接推送变化"""
+    get_material_cache().apply(materials, version)
+    get_event_hub().notify()
+
+
+def _unavailable_error(material_id, message):
+    """条件更新未命中时区分"物资不存在"和"状态不符" """
+    material = db.session.get(Material, material_id)
+    if not material:
+        return BorrowError("物资不存在", 404)
+    return BorrowError(message.format(name=material.name, status=material.status))
+
+
+def borrow(material_id, borrower, student_id):
+    """借用物资，成功时返回 (material, record)，失败抛出 BorrowError"""
+    now = datetime.now()
+    try:
+        result = db.session.execute(
+            update(Material)
+            .where(Material.id == material_id, Material.status == 'available')
+            .values(
+                status='borrowed',
+                current_holder=borrower,
+                borrow_time=now,
+                expected_return=now + timedelta(days=BORROW_DAYS)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            raise _unavailable_error(material_id, "物资 [{name}] 当前不可用，状态: {status}")
+
+        record = BorrowRecord(
+            material_id=material_id,
+            borrower=borrower,
+            student_id=student_id,
+            borrow_time=now
+        )
+        db.session.add(record)
+        version = bump_inventory_version()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    material = db.session.get(Material, material_id, populate_existing=True)
+    _publish([material], version)
+    return material, record
+
+
+def return_(material_id, borrower, student_id):
+    """归还物资（需验证借用人身份），成功时返回 (material, record)，失败抛出 BorrowError"""
+    try:
+        material = db.session.get(Material, material_id)
+        if not material:
+            raise BorrowError("物资不存在", 404)
+
+        if material.status != 'borrowed':
+            raise BorrowError(f"物资 [{material.name}] 当前状态不可归还")
+
+        record = BorrowRecord.query.filter_by(
+            material_id=material_id,
+            status='borrowed'
+        ).first()
+        if not record:
+            raise BorrowError("未找到借用记录")
+
+        # 验证身份信息
+        if record.borrower != borrower or record.student_id != student_id:
+            raise BorrowError("身份验证失败：姓名或学号不匹配", 403)
+
+        now = datetime.now()
+        closed = db.session.execute(
+            update(BorrowRecord)
+            .where(BorrowRecord.id == record.id, BorrowRecord.status == 'borrowed')
+            .values(status='returned', return_time=now)
+            .execution_options(synchronize_session=False)
+        )
+        released = db.session.execute(
+            update(Material)
+            .where(Material.id == material_id, Material.status == 'borrowed')
+            .values(status='available', current_holder=None, borrow_time=None, expected_return=None)
+            .execution_options(synchronize_session=False)
+        )
+        if closed.rowcount != 1 or released.rowcount != 1:
+            raise BorrowError(f"物资 [{material.name}] 已被归还")
+
+        version = bump_inventory_version()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    db.session.refresh(record)
+    db.session.refresh(material)
+    _publish([material], version)
+    return material, record
+
+
+def admin_set_status(material_id, new_status):
+    """管理员手动修改物资状态，返回 (material, old_status)"""
+    try:
+        material = db.session.get(Material, material_id)
+        if not material:
+            raise BorrowError("物资不存在", 404)
+        old_status = material.status
+        now = datetime.now()
+
+        if new_status == 'available':
+            # 清空借用信息，并关闭所有未归还的记录
+            db.session.execute(
+                update(Material)
+                .where(Material.id == material_id)
+                .values(status='available', current_holder=None, borrow_time=None, expected_return=None)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.execute(
+                update(BorrowRecord)
+                .where(BorrowRecord.material_id == material_id, BorrowRecord.status == 'borrowed')
+                .values(status='returned', return_time=now)
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            db.session.execute(
+                update(Material)
+                .where(Material.id == material_id)
+                .values(status=new_status)
+                .execution_options(synchronize_session=False)
+            )
+            if new_status == 'borrowed':
+                # 设为借出但没有借用人时，记为管理员操作
+                db.session.execute(
+                    update(Material)
+                    .where(Material.id == material_id, Material.current_holder.is_(None))
+                    .values(
+                        current_holder="管理员操作",
+                        borrow_time=now,
+                        expected_return=now + timedelta(days=BORROW_DAYS)
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+
+        version = bump_inventory_version()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    db.session.refresh(material)
+    _publish([material], version)
+    return material, old_status
+
+
+def _load_batch(material_ids):
+    """用一条 IN (...) 查询加载整批物资，有不存在的ID时抛出 BorrowError"""
+    materials = Material.query.filter(Material.id.in_(material_ids)).all()
+    found = {m.id: m for m in materials}
+    missing = [str(i) for i in material_ids if i not in found]
+    if missing:
+        raise BorrowError(f"物资不存在: #{', #'.join(missing)}", 404)
+    return [found[i] for i in material_ids]
+
+
+def borrow_batch(material_ids, borrower, student_id):
+    """整套借用：全部可用才借出，任意一件不可用则整体失败。返回 (materials, records)"""
+    now = datetime.now()
+    try:
+        materials = _load_batch(material_ids)
+        unavailable = [f"{m.name}({m.status})" for m in materials if m.status != 'available']
+        if unavailable:
+            raise BorrowError(f"以下物资当前不可用: {', '.join(unavailable)}")
+
+        result = db.session.execute(
+            update(Material)
+            .where(Material.id.in_(material_ids), Material.status == 'available')
+            .values(
+                status='borrowed',
+                current_holder=borrower,
+                borrow_time=now,
+                expected_return=now + timedelta(days=BORROW_DAYS)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        # 校验之后被别人抢先借走的情况
+        if result.rowcount != len(material_ids):
+            raise BorrowError("部分物资刚刚被他人借出，请刷新后重试")
+
+        records = [
+            BorrowRecord(material_id=m.id, borrower=borrower, student_id=student_id, borrow_time=now)
+            for m in materials
+        ]
+        db.session.add_all(records)
+        version = bump_inventory_version()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for material in materials:
+        db.session.refresh(material)
+    _publish(materials, version)
+    return materials, records
+
+
+def return_batch(material_ids, borrower, student_id):
+    """整套归还：全部由该借用人持有才归还，否则整体失败。返回 (materials, records)"""
+    now = datetime.now()
+    try:
+        materials = _load_batch(material_ids)
+        not_borrowed = [m.name for m in materials if m.status != 'borrowed']
+        if not_borrowed:
+            raise BorrowError(f"以下物资当前状态不可归还: {', '.join(not_borrowed)}")
+
+        records = BorrowRecord.query.filter(
+            BorrowRecord.material_id.in_(material_ids),
+            BorrowRecord.status == 'borrowed'
+        ).all()
+        by_material = {r.material_id: r for r in records}
+        if len(by_material) != len(material_ids):
+            raise BorrowError("未找到借用记录")
+
+        # 验证身份信息
+        if any(r.borrower != borrower or r.student_id != student_id for r in records):
+            raise BorrowError("身份验证失败：姓名或学号不匹配", 403)
+
+        closed = db.session.execute(
+            update(BorrowRecord)
+            .where(BorrowRecord.id.in_([r.id for r in records]), BorrowRecord.status == 'borrowed')
+            .values(status='returned', return_time=now)
+            .execution_options(synchronize_session=False)
+        )
+        released = db.session.execute(
+            update(Material)
+            .where(Material.id.in_(material_ids), Material.status == 'borrowed')
+            .values(status='available', current_holder=None, borrow_time=None, expected_return=None)
+            .execution_options(synchronize_session=False)
+        )
+        if closed.rowcount != len(records) or released.rowcount != len(material_ids):
+            raise BorrowError("部分物资已被归还，请刷新后重试")
+
+        version = bump_inventory_version()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for obj in materials + records:
+        db.session.refresh(obj)
+    _publish(materials, version)
+    return materials, records
@@ -0,0 +1,119 @@
+"""
+HTML/JSON/CSS/JS/SVG 响应压缩（gzip，安装了 brotli 时优先使用 br）
+
+按 Accept-Encoding 协商编码，小于 COMPRESS_MIN_SIZE 的响应不压缩。
+带ETag的响应（按库存版本缓存的页面和接口、静态资源）压缩结果按 (URL, ETag, 编码) 缓存，
+内容不变时重复请求不再重新压缩。流式响应（NDJSON导出、SSE）不处理。
+"""
+import gzip
+import threading
+from collections import OrderedDict
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # 可选依赖，未安装时只提供gzip
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html',
+    'text/css',
+    'text/javascript',
+    'application/javascript',
+    'application/json',
+    'image/svg+xml',
+}
+
+
+def available_encodings():
+    """服务端支持的编码，按优先级排列"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    # mtime=0：相同内容得到相同的压缩结果
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class CompressedCache:
+    """压缩结果的LRU缓存"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def set(self, key, body):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def init_compression(app):
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return
+    app.extensions['compression'] = CompressedCache(app.config.get('COMPRESS_CACHE_SIZE', 256))
+    app.after_request(compress_response)
+
+
+def _should_compress(response):
+    if response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return False
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return False
+    # 生成器形式的流式响应逐块发送，不能整体压缩
+    return not response.is_streamed or response.direct_passthrough
+
+
+def compress_response(response):
+    """after_request：按 Accept-Encoding 压缩响应体"""
+    if request.method == 'HEAD' or not _should_compress(response):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return response
+
+    # send_from_directory 返回的文件响应在这里读入内存（静态资源都很小）
+    response.direct_passthrough = False
+    data = response.get_data()
+    config = current_app.config
+    if len(data) < config.get('COMPRESS_MIN_SIZE', 500):
+        return response
+
+    etag, weak = response.get_etag()
+    cache = current_app.extensions['compression']
+    key = (request.full_path, etag, encoding) if etag else None
+
+    body = cache.get(key) if key else None
+    if body is None:
+        level = config.get('COMPRESS_BR_LEVEL', 5) if encoding == 'br' else config.get('COMPRESS_LEVEL', 6)
+        body = compress(data, encoding, level)
+        if key:
+            cache.set(key, body)
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    # Range 按未压缩的文件计算，压缩后不再支持
+    response.headers.pop('Accept-Ranges', None)
+    if etag and not weak:
+        # 压缩后字节不同，强ETag降为弱ETag
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,59 @@
+"""
+基于库存版本的条件请求（ETag / Last-Modified / 304）
+
+列表接口和各页面的内容只取决于库存版本号和代码本身，
+客户端带上 If-None-Match 且库存未变化时直接返回304，不查询物资、不渲染页面。
+Last-Modified 只精确到秒，同一秒内的两次修改无法区分，因此不据 If-Modified-Since 返回304，
+只以库存版本（ETag）为准。
+"""
+import hashlib
+import os
+from datetime import timezone
+from functools import wraps
+
+from flask import current_app, request
+
+from .material_cache import get_material_cache
+
+
+def build_fingerprint(root):
+    """代码/模板/静态文件的指纹，部署新版本后旧的ETag全部失效"""
+    digest = hashlib.md5()
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d != '__pycache__')
+        for filename in sorted(filenames):
+            stat = os.stat(os.path.join(dirpath, filename))
+            digest.update(f"{os.path.relpath(os.path.join(dirpath, filename), root)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:8]
+
+
+def init_conditional(app):
+    app.config.setdefault('BUILD_FINGERPRINT', build_fingerprint(app.root_path))
+
+
+def inventory_etag(view):
+    """视图装饰器：按库存版本生成ETag，未变化时返回304"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        version, updated_at = get_material_cache().version_info()
+        etag = f"inv-{version}-{current_app.config['BUILD_FINGERPRINT']}"
+        # 数据库中保存的是本地时间
+        last_modified = updated_at.replace(microsecond=0).astimezone(timezone.utc) if updated_at else None
+
+        if request.if_none_match and request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        # 弱ETag：压缩后的响应与原始内容语义相同
+        response.set_etag(etag, weak=True)
+        if last_modified:
+            response.last_modified = last_modified
+        # 允许缓存，但每次使用前都要向服务器确认
+        response.cache_control.no_cache = True
+        return response
+
+    return wrapper
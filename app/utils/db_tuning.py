@@ -0,0 +1,43 @@
+"""
+SQLite连接调优
+
+每个新的数据库连接都会执行 config.py 中 SQLITE_PRAGMAS 配置的 PRAGMA：
+WAL 日志让读写互不阻塞，busy_timeout 让并发写入排队等待而不是立即报 "database is locked"。
+"""
+import logging
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas):
+    """在一个原始 sqlite3 连接上执行 PRAGMA"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def init_sqlite_pragmas(app, db):
+    """为应用的SQLite引擎注册连接事件，非SQLite数据库直接跳过"""
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    if not pragmas:
+        return
+
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+
+    if engine.url.database in (None, '', ':memory:'):
+        # 内存数据库不支持WAL
+        pragmas = {k: v for k, v in pragmas.items() if k != 'journal_mode'}
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+    logger.info(f"SQLite PRAGMA 已启用: {pragmas}")
@@ -39,6 +39,16 @@ class FeishuNotification:
 
     def send_borrow_notification(self, material_name, borrower, student_id, borrow_time):
         """发送借用通知"""
+        message_content = self._create_borrow_card(material_name, borrower, student_id, borrow_time)
+        return self._send_card(message_content, f"{borrower} 借用了 {material_name}")
+
+    def send_batch_borrow_notification(self, material_names, borrower, student_id, borrow_time):
+        """发送批量借用通知（整套物资合并为一条消息）"""
+        message_content = self._create_batch_borrow_card(material_names, borrower, student_id, borrow_time)
+        return self._send_card(message_content, f"{borrower} 批量借用了 {len(material_names)} 件物资")
+
+    def _send_card(self, message_content, summary):
+        """发送消息卡片到群组"""
         if not self.access_token:
             if not self.get_tenant_access_token():
                 return False
@@ -50,9 +60,6 @@ class FeishuNotification:
             "Authorization": f"Bearer {self.access_token}"
         }
 
-        # 创建消息卡片
-        message_content = self._create_borrow_card(material_name, borrower, student_id, borrow_time)
-
         data = {
             "receive_id": self.chat_id,  # ⚠️ 使用chat_id
             "msg_type": "interactive",
@@ -67,7 +74,7 @@ class FeishuNotification:
             print(f"🔍 飞书API响应: {result}")  # 调试信息
 
             if result.get("code") == 0:
-                logger.info(f"✅ 飞书通知发送成功: {borrower} 借用了 {material_name}")
+                logger.info(f"✅ 飞书通知发送成功: {summary}")
                 return True
             else:
                 logger.error(f"❌ 飞书通知发送失败: {result}")
@@ -124,6 +131,21 @@ class FeishuNotification:
             ]
         }
 
+    def _create_batch_borrow_card(self, material_names, borrower, student_id, borrow_time):
+        """创建批量借用通知消息卡片"""
+        card = self._create_borrow_card(
+            f"{len(material_names)} 件物资", borrower, student_id, borrow_time
+        )
+        card["header"]["title"]["content"] = "实验室物资批量借用通知"
+        card["elements"].insert(1, {
+            "tag": "div",
+            "text": {
+                "tag": "lark_md",
+                "content": "**物资清单**:\n" + "\n".join(f"- {name}" for name in material_names)
+            }
+        })
+        return card
+
 
 # 创建全局实例
 feishu_notifier = FeishuNotification()
\ No newline at end of file
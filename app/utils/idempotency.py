@@ -0,0 +1,175 @@
+"""
+借用/归还接口的幂等键支持
+
+客户端在请求头带上 Idempotency-Key，同一个键的重复提交（弱网重试、连点）
+直接返回第一次成功的响应，不再访问数据库。
+结果保存在有容量上限、带过期时间的存储中：进程内LRU，或通过 REDIS_URL 共享给多个worker。
+
+执行视图前先占用幂等键（Redis 为 SET NX），同一个键的并发请求（连点落到不同线程或worker）
+只有一个真正执行，其余等待它完成后重放结果；第一个请求失败时释放占用，等待中的请求接着执行。
+进程内存储只在单个进程内去重，多worker部署（gunicorn -w N）请使用 Redis。
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# 占用中（第一个请求仍在执行）的标记
+PENDING = {'pending': True}
+
+
+class MemoryIdempotencyStore:
+    """进程内LRU存储，超过容量时淘汰最久未使用的键"""
+
+    def __init__(self, max_entries=10000, ttl=86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_locked(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def get(self, key):
+        with self._lock:
+            return self._get_locked(key)
+
+    def _set_locked(self, key, value, ttl):
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def set(self, key, value):
+        with self._lock:
+            self._set_locked(key, value, self.ttl)
+
+    def reserve(self, key, ttl):
+        """键不存在时标记为占用中并返回 True；ttl 秒后占用自动失效"""
+        with self._lock:
+            if self._get_locked(key) is not None:
+                return False
+            self._set_locked(key, PENDING, ttl)
+            return True
+
+    def release(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class RedisIdempotencyStore:
+    """Redis存储，多个worker共享；Redis不可用时按未命中处理"""
+
+    def __init__(self, url, ttl=86400, prefix='robowarehouse:idempotency:'):
+        import redis
+        self.client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        try:
+            raw = self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"⚠️ 幂等键读取失败: {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+    def set(self, key, value):
+        try:
+            self.client.setex(self.prefix + key, self.ttl, json.dumps(value))
+        except Exception as e:
+            logger.warning(f"⚠️ 幂等键写入失败: {e}")
+
+    def reserve(self, key, ttl):
+        """SET NX 占用键，所有worker中只有一个请求成功；Redis不可用时直接执行"""
+        try:
+            return bool(self.client.set(self.prefix + key, json.dumps(PENDING), nx=True, ex=ttl))
+        except Exception as e:
+            logger.warning(f"⚠️ 幂等键占用失败: {e}")
+            return True
+
+    def release(self, key):
+        try:
+            self.client.delete(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"⚠️ 幂等键释放失败: {e}")
+
+
+def init_idempotency(app):
+    """根据 IDEMPOTENCY_BACKEND 创建存储"""
+    ttl = app.config.get('IDEMPOTENCY_TTL', 86400)
+    if app.config.get('IDEMPOTENCY_BACKEND') == 'redis':
+        store = RedisIdempotencyStore(app.config['REDIS_URL'], ttl=ttl)
+    else:
+        store = MemoryIdempotencyStore(app.config.get('IDEMPOTENCY_MAX_ENTRIES', 10000), ttl=ttl)
+    app.extensions['idempotency'] = store
+    return store
+
+
+def _replay(cached):
+    response = current_app.response_class(cached['body'], status=cached['status'], mimetype=cached['mimetype'])
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """视图装饰器：带 Idempotency-Key 的请求成功后，重复请求重放第一次的响应"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER, '').strip()
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({"error": f"{HEADER} 过长"}), 400
+
+        config = current_app.config
+        store = current_app.extensions['idempotency']
+        scoped_key = f"{request.method}:{request.path}:{key}"
+        deadline = time.monotonic() + config.get('IDEMPOTENCY_WAIT', 10.0)
+
+        while True:
+            cached = store.get(scoped_key)
+            if cached is not None and cached != PENDING:
+                return _replay(cached)
+            if cached is None and store.reserve(scoped_key, config.get('IDEMPOTENCY_INFLIGHT_TTL', 30)):
+                break
+            # 同一个键的请求正在执行：等它完成后重放结果
+            if time.monotonic() >= deadline:
+                return jsonify({"error": "相同的请求正在处理中，请稍后再试"}), 409
+            time.sleep(config.get('IDEMPOTENCY_POLL_INTERVAL', 0.05))
+
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            store.release(scoped_key)
+            raise
+
+        # 只缓存成功的结果：校验失败（如身份不匹配）后用户修改输入重新提交时应重新执行
+        if 200 <= response.status_code < 300:
+            store.set(scoped_key, {
+                'status': response.status_code,
+                'body': response.get_data(as_text=True),
+                'mimetype': response.mimetype
+            })
+        else:
+            store.release(scoped_key)
+        return response
+
+    return wrapper
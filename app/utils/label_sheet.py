@@ -0,0 +1,167 @@
+"""
+A4 二维码标签页
+
+把所有物资的二维码和名称/编号拼成A4标签页（PDF 或逐页 PNG），打印时只需下载一个文件，
+不必让浏览器逐个请求几百张二维码图片再自己排版。
+结果按库存版本缓存，物资没有变化时重复打印直接返回缓存。
+"""
+import io
+import logging
+import os
+import threading
+
+from flask import current_app
+from PIL import Image, ImageDraw, ImageFont
+
+
+logger = logging.getLogger(__name__)
+
+A4_MM = (210, 297)
+MM_PER_INCH = 25.4
+
+# 未配置 LABEL_FONT_PATH 时依次尝试的中文字体
+FONT_CANDIDATES = [
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
+    '/usr/share/fonts/wenquanyi/wqy-microhei/wqy-microhei.ttc',
+    '/System/Library/Fonts/PingFang.ttc',
+    'C:/Windows/Fonts/msyh.ttc',
+    'C:/Windows/Fonts/simhei.ttf',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+]
+
+
+def load_font(size, path=None):
+    for candidate in ([path] if path else []) + FONT_CANDIDATES:
+        if os.path.exists(candidate):
+            return ImageFont.truetype(candidate, size)
+    logger.warning("⚠️ 未找到可用字体，标签文字使用默认字体（中文可能无法显示）")
+    return ImageFont.load_default()
+
+
+def _fit_text(draw, text, font, width):
+    """文字超出标签宽度时截断并加省略号"""
+    if draw.textlength(text, font=font) <= width:
+        return text
+    while text and draw.textlength(text + '…', font=font) > width:
+        text = text[:-1]
+    return text + '…'
+
+
+class LabelLayout:
+    """A4标签页的排版参数（像素）"""
+
+    def __init__(self, dpi=300, columns=4, rows=6, margin_mm=10, font_path=None):
+        px = lambda mm: round(mm / MM_PER_INCH * dpi)
+        self.dpi = dpi
+        self.columns = columns
+        self.rows = rows
+        self.page_size = (px(A4_MM[0]), px(A4_MM[1]))
+        self.margin = px(margin_mm)
+        self.cell = (
+            (self.page_size[0] - 2 * self.margin) // columns,
+            (self.page_size[1] - 2 * self.margin) // rows,
+        )
+        self.font = load_font(max(self.cell[1] // 14, 10), font_path)
+        line_height = self.font.getbbox('国A')[3]
+        self.caption_height = 2 * line_height + self.cell[1] // 30
+        self.qr_size = min(self.cell[0], self.cell[1] - self.caption_height) - 2 * px(2)
+
+    @property
+    def per_page(self):
+        return self.columns * self.rows
+
+
+def _load_qr(material, qr_images, size):
+    """从二维码缓存取每模块1像素的PNG（未缓存时现场渲染）"""
+    _, png = qr_images.get(material, 'png', scale=1)
+    with Image.open(io.BytesIO(png)) as image:
+        qr = image.convert('1')
+    # 最近邻缩放，保持模块边缘清晰
+    return qr.resize((size, size), Image.NEAREST)
+
+
+def render_pages(materials, qr_images, layout):
+    """拼出全部标签页，返回黑白（1位）PIL图片列表"""
+    pages = []
+    for start in range(0, len(materials), layout.per_page):
+        page = Image.new('1', layout.page_size, 1)
+        draw = ImageDraw.Draw(page)
+        for index, material in enumerate(materials[start:start + layout.per_page]):
+            column, row = index % layout.columns, index // layout.columns
+            left = layout.margin + column * layout.cell[0]
+            top = layout.margin + row * layout.cell[1]
+            center = left + layout.cell[0] // 2
+
+            page.paste(_load_qr(material, qr_images, layout.qr_size), (center - layout.qr_size // 2, top))
+
+            text_top = top + layout.qr_size
+            name = _fit_text(draw, material.name, layout.font, layout.cell[0] - 20)
+            draw.text((center, text_top), name, font=layout.font, fill=0, anchor='ma')
+            draw.text((center, text_top + layout.caption_height // 2), f"#{material.id}",
+                      font=layout.font, fill=0, anchor='ma')
+        pages.append(page)
+    return pages
+
+
+def encode_pdf(pages, dpi):
+    buffer = io.BytesIO()
+    if not pages:
+        pages = [Image.new('1', (round(A4_MM[0] / MM_PER_INCH * dpi), round(A4_MM[1] / MM_PER_INCH * dpi)), 1)]
+    pages[0].save(buffer, 'PDF', resolution=dpi, save_all=True, append_images=pages[1:])
+    return buffer.getvalue()
+
+
+def encode_png(page, dpi):
+    buffer = io.BytesIO()
+    page.save(buffer, 'PNG', dpi=(dpi, dpi))
+    return buffer.getvalue()
+
+
+class LabelSheetCache:
+    """按库存版本缓存编码好的标签页（PDF、每页PNG），版本变化时整体重建
+
+    只保留编码后的结果（1位图压缩后每页十几KB），不常驻整页位图。
+    """
+
+    def __init__(self, layout):
+        self.layout = layout
+        self._lock = threading.Lock()
+        self._version = None
+        self._encoded = {}
+
+    def get(self, version, fmt, load_materials, qr_images):
+        """fmt 为 'pdf' 时返回PDF字节；为 'png' 时返回每页PNG字节的列表"""
+        layout = self.layout
+        with self._lock:
+            if self._version != version:
+                self._version = version
+                self._encoded = {}
+            if fmt not in self._encoded:
+                pages = render_pages(load_materials(), qr_images, layout)
+                if fmt == 'pdf':
+                    self._encoded[fmt] = encode_pdf(pages, layout.dpi)
+                else:
+                    self._encoded[fmt] = [encode_png(page, layout.dpi) for page in pages]
+            return self._encoded[fmt]
+
+    def clear(self):
+        with self._lock:
+            self._version = None
+            self._encoded = {}
+
+
+def init_label_sheets(app):
+    layout = LabelLayout(
+        dpi=app.config.get('LABEL_DPI', 300),
+        columns=app.config.get('LABEL_COLUMNS', 4),
+        rows=app.config.get('LABEL_ROWS', 6),
+        margin_mm=app.config.get('LABEL_MARGIN_MM', 10),
+        font_path=app.config.get('LABEL_FONT_PATH'),
+    )
+    app.extensions['label_sheets'] = LabelSheetCache(layout)
+
+
+def get_label_sheets():
+    return current_app.extensions['label_sheets']
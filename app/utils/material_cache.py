@@ -0,0 +1,186 @@
+"""
+物资状态缓存
+
+扫码页、借用/归还页、信息页和物资列表都从内存读取物资状态：
+按ID缓存单个物资，外加一份全量快照。
+写路径（借用、归还、管理员修改）提交后直接把新状态写入缓存；
+其他worker通过库存版本号（InventoryState.version）发现变化并清空缓存，
+版本号最多每 MATERIAL_CACHE_CHECK_INTERVAL 秒检查一次。
+"""
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from flask import abort, current_app
+
+from .. import db
+from ..models import Material, InventoryState, INVENTORY_STATE_ID
+
+SNAPSHOT_FIELDS = [
+    'id', 'name', 'description', 'qr_code', 'short_code', 'category', 'status',
+    'current_holder', 'borrow_time', 'expected_return', 'created_at'
+]
+
+
+class MaterialSnapshot(namedtuple('MaterialSnapshot', SNAPSHOT_FIELDS)):
+    """物资的只读快照，页面模板按与 Material 相同的属性名访问"""
+    __slots__ = ()
+
+    @classmethod
+    def from_model(cls, material):
+        return cls(*(getattr(material, field) for field in SNAPSHOT_FIELDS))
+
+    # 与 Material.to_dict 输出完全一致
+    to_dict = Material.to_dict
+
+
+class MaterialCache:
+    """按ID的物资缓存 + 全量快照，线程安全"""
+
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._items = {}
+        # 二维码短码 -> 物资ID
+        self._codes = {}
+        self._all = None
+        self._version = None
+        self._updated_at = None
+        self._checked_at = 0.0
+
+    def _read_version(self):
+        return db.session.execute(
+            db.select(InventoryState.version, InventoryState.updated_at)
+            .where(InventoryState.id == INVENTORY_STATE_ID)
+        ).one()
+
+    def _sync(self):
+        """检查共享的库存版本，其他进程修改过物资时清空本地缓存"""
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return
+        version, updated_at = self._read_version()
+        with self._lock:
+            # 版本只前进：读版本与 apply() 并发时读到的旧版本不能回退缓存
+            if self._version is None or version > self._version:
+                self._items.clear()
+                self._codes.clear()
+                self._all = None
+                self._version = version
+                self._updated_at = updated_at
+            self._checked_at = now
+
+    def version(self):
+        """当前库存版本号"""
+        self._sync()
+        return self._version
+
+    def version_info(self):
+        """(库存版本号, 最后变化时间)"""
+        self._sync()
+        with self._lock:
+            return self._version, self._updated_at
+
+    def get(self, material_id):
+        """获取单个物资快照，不存在时返回 None"""
+        self._sync()
+        snapshot = self._items.get(material_id)
+        if snapshot is not None:
+            return snapshot
+
+        version = self._version
+        material = db.session.get(Material, material_id)
+        if material is None:
+            return None
+        return self._store(MaterialSnapshot.from_model(material), version)
+
+    def _store(self, snapshot, version):
+        with self._lock:
+            # 读库期间缓存已被写路径更新过，则放弃这次（可能过期的）结果
+            if self._version == version:
+                self._items[snapshot.id] = snapshot
+                if snapshot.short_code:
+                    self._codes[snapshot.short_code] = snapshot.id
+        return snapshot
+
+    def get_by_short_code(self, short_code):
+        """按二维码短码获取物资快照，不存在时返回 None；未缓存时走 short_code 唯一索引"""
+        self._sync()
+        material_id = self._codes.get(short_code)
+        if material_id is not None:
+            snapshot = self._items.get(material_id)
+            if snapshot is not None:
+                return snapshot
+
+        version = self._version
+        material = Material.query.filter_by(short_code=short_code).first()
+        if material is None:
+            return None
+        return self._store(MaterialSnapshot.from_model(material), version)
+
+    def get_or_404(self, material_id):
+        snapshot = self.get(material_id)
+        if snapshot is None:
+            abort(404)
+        return snapshot
+
+    def all(self):
+        """全部物资快照（按ID排序）"""
+        self._sync()
+        snapshots = self._all
+        if snapshots is not None:
+            return snapshots
+
+        version = self._version
+        snapshots = [MaterialSnapshot.from_model(m) for m in Material.query.order_by(Material.id).all()]
+        with self._lock:
+            if self._version == version:
+                self._all = snapshots
+                self._items.update((s.id, s) for s in snapshots)
+                self._codes.update((s.short_code, s.id) for s in snapshots if s.short_code)
+        return snapshots
+
+    def apply(self, materials, version):
+        """写路径提交后调用：把新状态写入缓存
+
+        version 必须正好比缓存已知的版本大1，否则说明中间有其他进程/线程的修改，直接清空缓存。
+        """
+        snapshots = [MaterialSnapshot.from_model(m) for m in materials]
+        with self._lock:
+            self._updated_at = datetime.now()
+            if self._version is None or version != self._version + 1:
+                self._items.clear()
+                self._codes.clear()
+                self._all = None
+                self._version = version if self._version is None else max(version, self._version)
+                return
+
+            self._version = version
+            changed = {s.id: s for s in snapshots}
+            self._items.update(changed)
+            self._codes.update((s.short_code, s.id) for s in snapshots if s.short_code)
+            if self._all is not None:
+                self._all = [changed.get(s.id, s) for s in self._all]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._codes.clear()
+            self._all = None
+            self._version = None
+            self._updated_at = None
+
+
+def init_material_cache(app):
+    """创建物资缓存并确保库存版本行存在"""
+    from ..models import ensure_inventory_state
+    with app.app_context():
+        ensure_inventory_state()
+    cache = MaterialCache(app.config.get('MATERIAL_CACHE_CHECK_INTERVAL', 1.0))
+    app.extensions['material_cache'] = cache
+    return cache
+
+
+def get_material_cache():
+    return current_app.extensions['material_cache']
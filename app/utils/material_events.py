@@ -0,0 +1,146 @@
+"""
+物资状态变化推送（Server-Sent Events）
+
+借用、归还、管理员修改提交后，/api/events 把变化的物资推送给打开着 /admin、/debug 的浏览器，
+页面就地更新对应卡片，不再整页刷新。
+
+每个进程一个 MaterialEventHub：库存版本变化时对比物资缓存的前后快照得到增量，
+按版本号记录最近的事件。本进程的写路径提交后立即唤醒所有连接；
+其他worker的修改最多 SSE_POLL_INTERVAL 秒后被发现。
+事件ID就是库存版本号，浏览器断线重连时带上 Last-Event-ID 即可补发错过的事件。
+"""
+import json
+import threading
+import time
+from collections import deque
+
+from flask import current_app
+
+from .. import db
+
+# SSE 事件类型
+EVENT_MATERIAL = 'material'
+EVENT_RESYNC = 'resync'
+
+
+class MaterialEventHub:
+    """进程内的物资变化事件，线程安全"""
+
+    def __init__(self, history=100):
+        self._cond = threading.Condition()
+        self._version = None
+        self._snapshots = {}
+        self._events = deque(maxlen=history)
+        # 早于 _base 的版本已无法补发
+        self._base = None
+        self._wakeups = 0
+
+    def notify(self):
+        """写路径提交后调用，唤醒等待中的连接立即检查"""
+        with self._cond:
+            self._wakeups += 1
+            self._cond.notify_all()
+
+    def wait(self, seen, timeout):
+        """等待 notify 或超时，返回最新的唤醒计数"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._wakeups != seen, timeout)
+            return self._wakeups
+
+    def poll(self, cache):
+        """库存版本变化时对比快照，生成一条增量事件"""
+        version = cache.version()
+        if version == self._version:
+            return
+        # 快照在锁外生成（可能要查库），锁内只做对比和记录；
+        # 并发轮询时版本不前进的一方直接放弃，不会用旧快照覆盖新快照
+        snapshots = {s.id: s for s in cache.all()}
+        with self._cond:
+            if self._version is not None and version <= self._version:
+                return
+            if self._version is None:
+                self._base = version
+            else:
+                changed = [s for id_, s in snapshots.items() if self._snapshots.get(id_) != s]
+                removed = [id_ for id_ in self._snapshots if id_ not in snapshots]
+                if changed or removed:
+                    self._record(version, changed, removed, snapshots)
+            self._version = version
+            self._snapshots = snapshots
+
+    def _record(self, version, changed, removed, snapshots):
+        if len(self._events) == self._events.maxlen:
+            self._base = self._events[0][0]
+        counts = {'total': len(snapshots), 'available': 0, 'borrowed': 0}
+        for snapshot in snapshots.values():
+            if snapshot.status in counts:
+                counts[snapshot.status] += 1
+        data = json.dumps({
+            'version': version,
+            'materials': [s.to_dict() for s in changed],
+            'removed': removed,
+            'counts': counts
+        }, ensure_ascii=False)
+        self._events.append((version, data))
+
+    def events_since(self, last_version):
+        """版本 last_version 之后的事件 [(version, data)]；已无法补发时返回 None"""
+        with self._cond:
+            if last_version is None or self._version is None or last_version >= self._version:
+                return []
+            if last_version < self._base:
+                return None
+            return [(v, data) for v, data in self._events if v > last_version]
+
+    def version(self):
+        with self._cond:
+            return self._version
+
+    def stream(self, cache, since, poll_interval=2.0, keepalive=15.0, max_duration=300.0):
+        """SSE 响应体生成器
+
+        连接保持 max_duration 秒后结束，浏览器会带上 Last-Event-ID 自动重连，避免长期占用工作线程。
+        """
+        yield f"retry: {int(poll_interval * 1000)}\n\n"
+        self.poll(cache)
+        last = since if since is not None else self.version()
+        seen = self._wakeups
+        deadline = time.monotonic() + max_duration
+        idle_since = time.monotonic()
+
+        while True:
+            events = self.events_since(last)
+            # 读完版本立即归还数据库连接，长连接期间不占用连接池
+            db.session.close()
+            if events is None:
+                yield f"event: {EVENT_RESYNC}\ndata: {{}}\n\n"
+                return
+            for version, data in events:
+                yield f"id: {version}\nevent: {EVENT_MATERIAL}\ndata: {data}\n\n"
+                last = version
+                idle_since = time.monotonic()
+
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            if now - idle_since >= keepalive:
+                yield ": keepalive\n\n"
+                idle_since = now
+
+            seen = self.wait(seen, min(poll_interval, deadline - now))
+            self.poll(cache)
+
+
+def init_material_events(app):
+    """创建事件中心，并以当前库存版本为起点"""
+    from .material_cache import get_material_cache
+    hub = MaterialEventHub(app.config.get('SSE_HISTORY', 100))
+    app.extensions['material_events'] = hub
+    with app.app_context():
+        hub.poll(get_material_cache())
+        db.session.close()
+    return hub
+
+
+def get_event_hub():
+    return current_app.extensions['material_events']
@@ -0,0 +1,82 @@
+"""
+物资列表的服务端筛选与游标分页
+
+按 id 做 keyset 分页：WHERE id > :cursor ORDER BY id LIMIT :limit+1，
+筛选条件和分页都在SQL中完成，只加载请求的一页。
+"""
+import json
+
+from flask import current_app
+from sqlalchemy import func
+
+from ..models import db, Material
+
+FILTER_PARAMS = ('status', 'category', 'holder', 'prefix')
+PAGE_PARAMS = ('cursor', 'limit')
+
+
+class QueryError(ValueError):
+    """查询参数无效"""
+
+
+def parse_page_args(args):
+    """从请求参数解析 (filters, cursor, limit)，参数无效时抛出 QueryError"""
+    filters = {name: args.get(name, '').strip() for name in FILTER_PARAMS}
+    filters = {name: value for name, value in filters.items() if value}
+
+    try:
+        cursor = int(args['cursor']) if args.get('cursor') else None
+        limit = int(args['limit']) if args.get('limit') else current_app.config.get('MATERIALS_PAGE_SIZE', 50)
+    except ValueError:
+        raise QueryError("cursor 和 limit 必须是整数")
+    max_limit = current_app.config.get('MATERIALS_MAX_PAGE_SIZE', 500)
+    if limit < 1 or limit > max_limit:
+        raise QueryError(f"limit 必须在 1 到 {max_limit} 之间")
+
+    return filters, cursor, limit
+
+
+def filtered_query(filters):
+    """构造带筛选条件的查询"""
+    query = Material.query
+    if 'status' in filters:
+        query = query.filter(Material.status == filters['status'])
+    if 'category' in filters:
+        query = query.filter(Material.category == filters['category'])
+    if 'holder' in filters:
+        query = query.filter(Material.current_holder == filters['holder'])
+    if 'prefix' in filters:
+        query = query.filter(Material.name.startswith(filters['prefix'], autoescape=True))
+    return query
+
+
+def fetch_page(filters, cursor=None, limit=50):
+    """返回 (materials, next_cursor)，没有下一页时 next_cursor 为 None"""
+    query = filtered_query(filters)
+    if cursor is not None:
+        query = query.filter(Material.id > cursor)
+    materials = query.order_by(Material.id).limit(limit + 1).all()
+
+    if len(materials) > limit:
+        materials = materials[:limit]
+        return materials, materials[-1].id
+    return materials, None
+
+
+def status_counts():
+    """各状态的物资数量，一次 GROUP BY 查询"""
+    rows = db.session.query(Material.status, func.count(Material.id)).group_by(Material.status).all()
+    return dict(rows)
+
+
+def categories():
+    """所有物资分类（走 category 索引）"""
+    rows = db.session.query(Material.category).distinct().order_by(Material.category).all()
+    return [category for category, in rows if category]
+
+
+def export_lines(filters, batch_size=500):
+    """逐行生成NDJSON，按 batch_size 分批从数据库读取，内存占用与表大小无关"""
+    query = filtered_query(filters).order_by(Material.id).yield_per(batch_size)
+    for material in query:
+        yield json.dumps(material.to_dict(), ensure_ascii=False) + '\n'
@@ -0,0 +1,56 @@
+"""
+预渲染页面缓存
+
+扫码落地页（/scan/<id>）是所有二维码指向的地址，访问量最大，而每件物资只有少数几种可能的页面。
+渲染结果按 (页面, material_id) 缓存，并记下渲染时的 (状态, 库存版本)；
+借用、归还、管理员修改都会递增库存版本，之后的访问发现版本不同即重新渲染。
+命中时扫码只是几次字典查找。
+"""
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class PageCache:
+    """按物资缓存渲染好的HTML，LRU淘汰，线程安全"""
+
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, page, material, version, render):
+        """返回 page 页面对 material 的渲染结果，缓存失效时调用 render() 重新渲染"""
+        key = (page, material.id)
+        stamp = (material.status, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        body = render()
+        with self._lock:
+            self._entries[key] = (stamp, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def init_page_cache(app):
+    cache = PageCache(app.config.get('PAGE_CACHE_SIZE', 5000))
+    app.extensions['page_cache'] = cache
+    return cache
+
+
+def get_page_cache():
+    return current_app.extensions['page_cache']
@@ -1,7 +1,26 @@
+import hashlib
+import io
+import multiprocessing
 import qrcode
 import os
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
 import socket
+from urllib.parse import urlsplit
+
+# 每个进程至少分到的二维码数，数量太少时启动进程池得不偿失
+MIN_JOBS_PER_WORKER = 50
+
+
+def _pool_context():
+    """进程池的启动方式：不使用 fork
+
+    后台刷新在多线程的Web服务器里创建进程池，fork 时其他线程可能正持有导入锁、日志锁
+    （Pillow 首次保存PNG时才加载插件），子进程会死锁。Linux 上用 forkserver，其他平台用 spawn。
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
 
 
 def get_local_ip():
@@ -16,34 +35,231 @@ def get_local_ip():
         return "localhost"
 
 
-def generate_qr_code(material_id, material_name, base_url=None):
-    """为物资生成唯一二维码 - 智能选择最佳地址"""
-    if base_url is None:
-        # 优先使用IP地址，兼容性最好
-        local_ip = get_local_ip()
-        base_url = f"http://{local_ip}:5000"
+def default_base_url():
+    """二维码中的默认地址：优先使用IP地址，兼容性最好"""
+    return f"http://{get_local_ip()}:5000"
+
+
+def resolve_base_url(config):
+    """二维码中的地址：配置了 PUBLIC_BASE_URL 时使用它（换网络不必重新生成），否则为本机IP"""
+    return (config.get('PUBLIC_BASE_URL') or default_base_url()).rstrip('/')
 
-    qr_data = f"{base_url}/scan/{material_id}"
 
+# 影响二维码图片的渲染参数，参与内容哈希：修改后所有二维码会重新生成
+QR_RENDER_PARAMS = {
+    'version': 1,
+    'error_correction': 'L',
+    'box_size': 10,
+    'border': 4,
+}
+
+ERROR_CORRECTION_LEVELS = {
+    'L': qrcode.constants.ERROR_CORRECT_L,
+    'M': qrcode.constants.ERROR_CORRECT_M,
+    'Q': qrcode.constants.ERROR_CORRECT_Q,
+    'H': qrcode.constants.ERROR_CORRECT_H,
+}
+
+
+# 输出格式：PNG为1位黑白图，scale 为每个模块的像素数；SVG为矢量路径，打印时任意缩放都清晰
+QR_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+
+def _make_qr(data):
     qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
+        version=QR_RENDER_PARAMS['version'],
+        error_correction=ERROR_CORRECTION_LEVELS[QR_RENDER_PARAMS['error_correction']],
+        box_size=QR_RENDER_PARAMS['box_size'],
+        border=QR_RENDER_PARAMS['border'],
     )
-    qr.add_data(qr_data)
+    qr.add_data(data)
     qr.make(fit=True)
+    return qr
+
+
+def make_qr_image(data):
+    """生成二维码图片（PIL Image），不写文件"""
+    return _make_qr(data).make_image(fill_color="black", back_color="white")
+
+
+def qr_matrix(data):
+    """二维码模块矩阵（含静区），True 为黑色模块"""
+    return _make_qr(data).get_matrix()
+
+
+def _matrix_to_image(matrix, scale):
+    """模块矩阵直接转为1位图，不经过逐个模块绘制"""
+    size = len(matrix)
+    image = Image.new('1', (size, size))
+    image.putdata([0 if dark else 1 for row in matrix for dark in row])
+    if scale > 1:
+        image = image.resize((size * scale, size * scale), Image.NEAREST)
+    return image
+
+
+def _matrix_to_svg(matrix):
+    """模块矩阵转为SVG，同一行连续的黑色模块合并成一个矩形"""
+    size = len(matrix)
+    path = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < size and row[x]:
+                x += 1
+            path.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/><path d="{"".join(path)}"/></svg>'
+    )
+
+
+def render_qr(data, fmt='png', scale=None):
+    """渲染二维码，返回编码后的字节
+
+    fmt 为 'png' 时输出1位黑白PNG，scale 默认与原来的 box_size 相同；
+    scale=1 时一个模块一个像素，由页面按 image-rendering: pixelated 放大显示。
+    """
+    matrix = qr_matrix(data)
+    if fmt == 'svg':
+        return _matrix_to_svg(matrix).encode('utf-8')
+    buffer = io.BytesIO()
+    _matrix_to_image(matrix, scale or QR_RENDER_PARAMS['box_size']).save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def qr_payload(material_id, base_url, short_code=None):
+    """二维码中编码的地址
+
+    有短码时为 <地址>/S/<短码>：协议和主机名不区分大小写，转成大写后整个地址都在QR字母数字模式的字符集内，
+    每个字符只占5.5位，带IP和端口的地址也能放进版本2。没有短码时退回扫码页地址。
+    """
+    if not short_code:
+        return f"{base_url}/scan/{material_id}"
+    parts = urlsplit(base_url)
+    return f"{parts.scheme.upper()}://{parts.netloc.upper()}{parts.path}/S/{short_code}"
 
-    img = qr.make_image(fill_color="black", back_color="white")
 
-    qr_dir = "static/qrcodes"
+def qr_hash(data):
+    """二维码内容哈希：编码的地址 + 渲染参数，两者都不变时图片不变"""
+    params = ','.join(f"{key}={value}" for key, value in sorted(QR_RENDER_PARAMS.items()))
+    return hashlib.sha256(f"{data}|{params}".encode('utf-8')).hexdigest()
+
+
+def qr_filename(material_id, digest):
+    """物资二维码的文件名，按内容哈希命名，内容变化时文件名随之变化"""
+    return f"material_{material_id}_{digest[:16]}.png"
+
+
+def _write_qr_file(job):
+    """生成一个二维码并写入文件（进程池中执行，参数和返回值都可pickle）
+
+    返回 (material_id, filename, error)；单个失败不影响同一批的其他二维码。
+    """
+    material_id, data, filename, qr_dir = job
+    try:
+        with open(os.path.join(qr_dir, filename), 'wb') as f:
+            f.write(render_qr(data))
+    except Exception as e:
+        return material_id, None, str(e)
+    return material_id, filename, None
+
+
+def print_progress(done, total):
+    """默认进度输出：大约每10%打印一次"""
+    step = max(total // 10, 1)
+    if done % step == 0 or done == total:
+        print(f"🔄 二维码生成进度: {done}/{total}")
+
+
+def generate_qr_codes(materials, base_url=None, qr_dir="static/qrcodes", max_workers=None, progress=print_progress,
+                      errors=None):
+    """并行生成一批二维码，返回 {material_id: filename}
+
+    二维码编码和PNG写入都是CPU密集的纯Python/Pillow操作，用进程池分摊到多个核心；
+    max_workers 为进程数上限（默认CPU核数），数量很少或只有一个进程时直接在当前进程生成。
+    progress(done, total) 在每个二维码完成后调用。
+    生成失败的物资不在返回结果中，(material_id, 错误信息) 追加到 errors 列表。
+    """
+    if base_url is None:
+        base_url = default_base_url()
     os.makedirs(qr_dir, exist_ok=True)
-    filename = f"material_{material_id}_{material_name}.png".replace(' ', '_')
-    filepath = os.path.join(qr_dir, filename)
 
-    img.save(filepath)
-    print(f"✅ 二维码已生成: {qr_data}")
-    return filename
+    jobs = []
+    for material in materials:
+        data = qr_payload(material.id, base_url, getattr(material, 'short_code', None))
+        jobs.append((material.id, data, qr_filename(material.id, qr_hash(data)), qr_dir))
+    total = len(jobs)
+    workers = min(max_workers or os.cpu_count() or 1, os.cpu_count() or 1, max(total // MIN_JOBS_PER_WORKER, 1))
+
+    filenames = {}
+
+    def collect(results):
+        for done, (material_id, filename, error) in enumerate(results, 1):
+            if error is None:
+                filenames[material_id] = filename
+            else:
+                print(f"❌ 物资 {material_id} 的二维码生成失败: {error}")
+                if errors is not None:
+                    errors.append((material_id, error))
+            if progress:
+                progress(done, total)
+
+    if workers <= 1:
+        collect(map(_write_qr_file, jobs))
+        return filenames
+
+    # 分块提交，减少进程间通信次数
+    chunksize = max(total // (workers * 8), 1)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as executor:
+        collect(executor.map(_write_qr_file, jobs, chunksize=chunksize))
+    return filenames
+
+
+def refresh_qr_codes(materials, base_url=None, qr_dir="static/qrcodes", max_workers=None, progress=print_progress,
+                     errors=None):
+    """只为内容哈希变化（或文件丢失）的物资重新生成二维码，返回重新生成的数量
+
+    直接更新 material.qr_code / material.qr_hash，由调用方提交；
+    地址和渲染参数都没变时不做任何图片处理。生成失败的物资保持原样，见 errors。
+    """
+    if base_url is None:
+        base_url = default_base_url()
+
+    stale = []
+    digests = {}
+    for material in materials:
+        digest = qr_hash(qr_payload(material.id, base_url, getattr(material, 'short_code', None)))
+        filename = qr_filename(material.id, digest)
+        if (material.qr_hash == digest and material.qr_code == filename
+                and os.path.exists(os.path.join(qr_dir, filename))):
+            continue
+        stale.append(material)
+        digests[material.id] = digest
+
+    if not stale:
+        return 0
+
+    filenames = generate_qr_codes(stale, base_url, qr_dir, max_workers, progress, errors)
+    for material in stale:
+        if material.id not in filenames:
+            continue
+        old_filename = material.qr_code
+        material.qr_code = filenames[material.id]
+        material.qr_hash = digests[material.id]
+        # 删除内容已过期的旧文件
+        if old_filename and old_filename != material.qr_code:
+            try:
+                os.remove(os.path.join(qr_dir, old_filename))
+            except OSError:
+                pass
+    return len(filenames)
 
 
 def get_hostname():
@@ -51,13 +267,20 @@ def get_hostname():
     import socket
     return socket.gethostname()
 
-def batch_generate_qr_codes(materials):
-    """批量生成二维码"""
-    from app import create_app
-    app = create_app()
 
-    with app.app_context():
-        for material in materials:
-            generate_qr_code(material.id, material.name)
+def batch_generate_qr_codes(materials, base_url=None, max_workers=None, progress=print_progress, errors=None):
+    """按当前应用的配置批量刷新二维码（并行，只生成内容变化的），返回重新生成的数量
+
+    需在应用上下文中调用；更新 material.qr_code / material.qr_hash，由调用方提交。
+    """
+    from flask import current_app
+    config = current_app.config
+
+    if base_url is None:
+        base_url = resolve_base_url(config)
+    if max_workers is None:
+        max_workers = config.get('QR_MAX_WORKERS')
+    regenerated = refresh_qr_codes(materials, base_url, config['QR_CODE_DIR'], max_workers, progress, errors)
 
-    print(f"🎉 已为 {len(materials)} 个物资生成二维码")
\ No newline at end of file
+    print(f"🎉 {len(materials)} 个物资中 {regenerated} 个二维码已重新生成")
+    return regenerated
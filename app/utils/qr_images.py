@@ -0,0 +1,103 @@
+"""
+按需渲染的二维码图片（/qr/<material_id>.png、/qr/<material_id>.svg）
+
+第一次请求时渲染，字节按 (内容哈希, 格式) 放入有界LRU（内容哈希 = 编码的地址 + 渲染参数），
+配置了 QR_DISK_CACHE_DIR 时再落一份到磁盘，进程重启后不必重新渲染。
+内容哈希同时作为强ETag，打印页和扫码不再依赖预先生成的文件，物资改名也不会出现失效的图片链接。
+"""
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+
+from .qr_generator import QR_RENDER_PARAMS, qr_hash, qr_payload, render_qr, resolve_base_url
+
+logger = logging.getLogger(__name__)
+
+
+class QRImageCache:
+    """二维码图片的LRU缓存（可选磁盘二级缓存），线程安全"""
+
+    def __init__(self, base_url, max_entries=2000, disk_dir=None):
+        self.base_url = base_url
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, material, fmt='png', scale=None):
+        """返回 material 二维码的 (ETag, 图片字节)；PNG的 scale 为每个模块的像素数"""
+        data = qr_payload(material.id, self.base_url, material.short_code)
+        if fmt == 'svg':
+            variant = 'svg'
+        else:
+            scale = scale or QR_RENDER_PARAMS['box_size']
+            variant = f"png{scale}"
+        key = f"{qr_hash(data)[:32]}-{variant}"
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                return key, body
+
+        body = self._read_disk(key, fmt)
+        if body is None:
+            body = render_qr(data, fmt, scale)
+            self._write_disk(key, fmt, body)
+
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return key, body
+
+    def _disk_path(self, key, fmt):
+        return os.path.join(self.disk_dir, f"{key}.{fmt}")
+
+    def _read_disk(self, key, fmt):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key, fmt), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, fmt, body):
+        if not self.disk_dir:
+            return
+        # 先写临时文件再改名，并发请求不会读到写了一半的文件
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, self._disk_path(key, fmt))
+        except OSError as e:
+            logger.warning(f"⚠️ 二维码磁盘缓存写入失败: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def init_qr_images(app):
+    cache = QRImageCache(
+        resolve_base_url(app.config),
+        max_entries=app.config.get('QR_CACHE_SIZE', 2000),
+        disk_dir=app.config.get('QR_DISK_CACHE_DIR'),
+    )
+    app.extensions['qr_images'] = cache
+    return cache
+
+
+def get_qr_images():
+    return current_app.extensions['qr_images']
@@ -0,0 +1,160 @@
+"""
+后台二维码刷新任务
+
+启动时以及 POST /api/generate-qrcodes 触发的二维码刷新不再阻塞：任务提交到进程内的线程池，
+在本应用的上下文中调用 batch_generate_qr_codes，立即返回任务ID，
+进度通过 /api/qrcodes/jobs/<job_id>（最近一次任务：/api/qrcodes/status）查询。
+刷新完成前访问 /qrcodes/<filename> 的请求按需渲染，不会404。
+"""
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import current_app
+
+from .. import db
+from ..models import Material
+from .qr_generator import batch_generate_qr_codes
+
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+class QRJob:
+    """一次二维码刷新任务的状态，线程安全"""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = JOB_PENDING
+        self.done = 0
+        self.total = 0
+        self.stale = 0
+        self.regenerated = 0
+        self.errors = []
+        self.created_at = datetime.now()
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+
+    def progress(self, done, stale):
+        """refresh_qr_codes 的进度回调：stale 为需要重新生成的数量，其余物资的二维码已是最新，计入完成数"""
+        with self._lock:
+            self.stale = stale
+            self.done = self.total - stale + done
+
+    def start(self, total):
+        with self._lock:
+            self.status = JOB_RUNNING
+            self.total = total
+
+    def finish(self, regenerated=0, errors=(), error=None):
+        """结束任务：errors 为单个物资的失败 [(material_id, 错误信息)]，error 为整个任务失败的原因"""
+        with self._lock:
+            self.regenerated = regenerated
+            self.errors.extend(f"#{material_id}: {message}" for material_id, message in errors)
+            if error is not None:
+                self.errors.append(error)
+                self.status = JOB_FAILED
+            else:
+                # 没有需要重新生成的二维码时进度回调不会被调用
+                self.done = self.total
+                self.status = JOB_DONE
+            self.finished_at = datetime.now()
+        self._finished.set()
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    def wait(self, timeout=None):
+        """等待任务结束，返回是否已结束"""
+        return self._finished.wait(timeout)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'job_id': self.id,
+                'status': self.status,
+                'done': self.done,
+                'total': self.total,
+                'stale': self.stale,
+                'regenerated': self.regenerated,
+                'errors': list(self.errors),
+                'created_at': self.created_at.isoformat(),
+                'finished_at': self.finished_at.isoformat() if self.finished_at else None
+            }
+
+
+class QRJobRunner:
+    """在线程池中执行二维码刷新任务，每个任务在本应用的新应用上下文中运行
+
+    刷新的是全部物资，已有任务未结束时提交直接返回该任务，不会重复生成。
+    只保留最近 history 个任务的状态。
+    """
+
+    def __init__(self, app, history=20):
+        self.app = app
+        self.history = history
+        # 同一时间只有一个刷新任务；任务内部再按 QR_MAX_WORKERS 用进程池并行生成
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='qr-job')
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def submit(self):
+        with self._lock:
+            latest = self._latest_locked()
+            if latest is not None and not latest.finished:
+                return latest
+            job = QRJob()
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                self._jobs.popitem(last=False)
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def latest(self):
+        with self._lock:
+            return self._latest_locked()
+
+    def _latest_locked(self):
+        return next(reversed(self._jobs.values()), None)
+
+    def _run(self, job):
+        app = self.app
+        with app.app_context():
+            try:
+                materials = Material.query.all()
+                job.start(len(materials))
+                errors = []
+                regenerated = batch_generate_qr_codes(materials, progress=job.progress, errors=errors)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.exception("❌ 二维码刷新任务失败")
+                job.finish(error=str(e))
+            else:
+                logger.info(f"✅ 二维码刷新完成，重新生成 {regenerated}/{len(materials)} 个，失败 {len(errors)} 个")
+                job.finish(regenerated, errors)
+            finally:
+                db.session.remove()
+
+
+def init_qr_jobs(app):
+    runner = QRJobRunner(app, app.config.get('QR_JOB_HISTORY', 20))
+    app.extensions['qr_jobs'] = runner
+    return runner
+
+
+def get_qr_jobs():
+    return current_app.extensions['qr_jobs']
@@ -0,0 +1,60 @@
+"""
+借用记录的时间范围筛选与分页（/debug 页面）
+
+记录与所属物资在一次 JOIN 查询中加载，避免逐条读取物资的 N+1 查询。
+"""
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.orm import joinedload
+
+from ..models import BorrowRecord
+from .material_query import QueryError
+
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, DATE_FORMAT)
+    except ValueError:
+        raise QueryError(f"{name} 必须是 YYYY-MM-DD 格式的日期")
+
+
+def parse_record_args(args):
+    """从请求参数解析 (since, until, page, limit)，参数无效时抛出 QueryError
+
+    since/until 为日期（含当天），page 从 1 开始
+    """
+    since = _parse_date(args['since'], 'since') if args.get('since') else None
+    until = _parse_date(args['until'], 'until') if args.get('until') else None
+
+    try:
+        page = int(args['page']) if args.get('page') else 1
+        limit = int(args['limit']) if args.get('limit') else current_app.config.get('DEBUG_RECORDS_PAGE_SIZE', 20)
+    except ValueError:
+        raise QueryError("page 和 limit 必须是整数")
+    max_limit = current_app.config.get('DEBUG_RECORDS_MAX_PAGE_SIZE', 500)
+    if page < 1:
+        raise QueryError("page 必须大于 0")
+    if limit < 1 or limit > max_limit:
+        raise QueryError(f"limit 必须在 1 到 {max_limit} 之间")
+
+    return since, until, page, limit
+
+
+def fetch_records(since=None, until=None, page=1, limit=20):
+    """按借用时间倒序返回 (records, has_next)，records 已带上 material"""
+    query = BorrowRecord.query.options(joinedload(BorrowRecord.material))
+    if since is not None:
+        query = query.filter(BorrowRecord.borrow_time >= since)
+    if until is not None:
+        query = query.filter(BorrowRecord.borrow_time < until + timedelta(days=1))
+
+    records = (
+        query.order_by(BorrowRecord.borrow_time.desc(), BorrowRecord.id.desc())
+        .offset((page - 1) * limit)
+        .limit(limit + 1)
+        .all()
+    )
+    return records[:limit], len(records) > limit
@@ -0,0 +1,70 @@
+"""
+管理页面渲染基准：物资数量为 100 / 1000 / 10000 时 GET /admin 的耗时
+
+用法: python benchmarks/bench_admin_render.py [--sizes 100 1000 10000] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import Material
+
+
+def build_app(path, size):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{path}",
+        'CELERY_TASK_ALWAYS_EAGER': True,
+        'CELERY_BROKER_URL': 'memory://',
+        'CELERY_RESULT_BACKEND': 'cache+memory://',
+    })
+    with app.app_context():
+        db.session.execute(Material.__table__.insert(), [
+            {
+                'name': f"物资{i}",
+                'category': '电机',
+                'qr_code': f"bench_{i}.png",
+                'status': 'available' if i % 3 else 'borrowed',
+            }
+            for i in range(1, size + 1)
+        ])
+        db.session.commit()
+    return app
+
+
+def bench(size, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, 'bench.db'), size)
+        client = app.test_client()
+        client.get('/admin')  # 预热：模板编译、缓存加载
+
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get('/admin')
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200
+        with app.app_context():
+            db.engine.dispose()
+    return statistics.median(timings), len(response.data)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'物资数':>8} {'中位耗时(ms)':>14} {'页面大小(KB)':>14}")
+    for size in args.sizes:
+        median, length = bench(size, args.repeat)
+        print(f"{size:>8} {median:>14.1f} {length / 1024:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+批量生成二维码基准：单进程 vs 进程池
+
+用法: python benchmarks/bench_qr_batch.py [--count 10000] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.qr_generator import generate_qr_codes
+
+Item = namedtuple('Item', ['id', 'name'])
+
+
+def run(items, workers):
+    with tempfile.TemporaryDirectory() as qr_dir:
+        start = time.perf_counter()
+        generate_qr_codes(items, 'http://192.168.1.100:5000', qr_dir=qr_dir, max_workers=workers, progress=None)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    items = [Item(i, f"物资{i}") for i in range(1, args.count + 1)]
+    print(f"CPU核数: {os.cpu_count()}，二维码数: {args.count}")
+
+    serial = run(items, 1)
+    print(f"单进程: {serial:.1f}s ({args.count / serial:.0f} 个/秒)")
+    parallel = run(items, args.workers)
+    print(f"{args.workers} 进程: {parallel:.1f}s ({args.count / parallel:.0f} 个/秒)，加速 {serial / parallel:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+二维码输出格式基准：原来的PIL逐模块绘制PNG vs 1位PNG（scale=10、scale=1）vs SVG
+
+对比每个二维码的字节数（及gzip后）和编码耗时。
+
+用法: python benchmarks/bench_qr_formats.py [--count 500]
+"""
+import argparse
+import gzip
+import io
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import qrcode.image.svg
+
+from app.utils.qr_generator import _make_qr, make_qr_image, render_qr
+
+
+def legacy_png(data):
+    buffer = io.BytesIO()
+    make_qr_image(data).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def qrcode_svg(data):
+    buffer = io.BytesIO()
+    _make_qr(data).make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+    return buffer.getvalue()
+
+
+FORMATS = [
+    ('原PNG（PIL逐模块绘制）', legacy_png),
+    ('qrcode自带SVG', qrcode_svg),
+    ('1位PNG scale=10', lambda data: render_qr(data, 'png', 10)),
+    ('1位PNG scale=1', lambda data: render_qr(data, 'png', 1)),
+    ('SVG（行程合并）', lambda data: render_qr(data, 'svg')),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=500)
+    args = parser.parse_args()
+
+    payloads = [f"http://192.168.1.100:5000/scan/{i}" for i in range(1, args.count + 1)]
+    print(f"二维码数: {args.count}")
+    print(f"{'格式':<24}{'字节/个':>10}{'gzip后':>10}{'耗时/个':>12}")
+    for name, render in FORMATS:
+        start = time.perf_counter()
+        bodies = [render(data) for data in payloads]
+        elapsed = time.perf_counter() - start
+        size = sum(map(len, bodies)) / len(bodies)
+        gzipped = sum(len(gzip.compress(body)) for body in bodies) / len(bodies)
+        print(f"{name:<24}{size:>10.0f}{gzipped:>10.0f}{elapsed / len(bodies) * 1000:>10.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+归还路径查询基准：对比有无索引时按 (material_id, status) 查找未归还记录的耗时
+
+用法: python benchmarks/bench_return_lookup.py [--rows 1000000] [--lookups 2000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.models import Material, BorrowRecord
+
+DIALECT = sqlite.dialect()
+MATERIALS = 5000
+
+
+def build_database(path, rows, with_indexes):
+    """建表并写入 rows 条历史借用记录（每件物资最多一条未归还）"""
+    conn = sqlite3.connect(path)
+    for table in (Material.__table__, BorrowRecord.__table__):
+        conn.execute(str(CreateTable(table).compile(dialect=DIALECT)))
+        if with_indexes:
+            for index in table.indexes:
+                conn.execute(str(CreateIndex(index).compile(dialect=DIALECT)))
+
+    now = datetime.now()
+    conn.executemany(
+        "INSERT INTO material (id, name, category, status) VALUES (?, ?, '电机', ?)",
+        ((i, f"物资{i}", 'borrowed' if i % 2 else 'available') for i in range(1, MATERIALS + 1))
+    )
+
+    rng = random.Random(42)
+    history = (
+        (rng.randint(1, MATERIALS), f"用户{i % 300}", f"2024{i % 10000:04d}",
+         now - timedelta(minutes=i), now - timedelta(minutes=i - 30), 'returned')
+        for i in range(rows - MATERIALS // 2)
+    )
+    conn.executemany(
+        "INSERT INTO borrow_record (material_id, borrower, student_id, borrow_time, return_time, status) "
+        "VALUES (?, ?, ?, ?, ?, ?)", history
+    )
+    conn.executemany(
+        "INSERT INTO borrow_record (material_id, borrower, student_id, borrow_time, status) "
+        "VALUES (?, '当前用户', '20240001', ?, 'borrowed')",
+        ((i, now) for i in range(1, MATERIALS + 1, 2))
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    return conn
+
+
+# 与 return_material 中 filter_by(material_id=?, status='borrowed').first() 生成的SQL相同
+LOOKUP_SQL = (
+    "SELECT * FROM borrow_record "
+    "WHERE borrow_record.material_id = ? AND borrow_record.status = ? LIMIT 1"
+)
+
+
+def run(conn, lookups):
+    rng = random.Random(7)
+    ids = [rng.randrange(1, MATERIALS + 1, 2) for _ in range(lookups)]
+    timings = []
+    for material_id in ids:
+        start = time.perf_counter()
+        conn.execute(LOOKUP_SQL, (material_id, 'borrowed')).fetchone()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    plan = conn.execute("EXPLAIN QUERY PLAN " + LOOKUP_SQL, (ids[0], 'borrowed')).fetchall()
+    return timings, plan[-1][-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='历史借用记录条数')
+    parser.add_argument('--lookups', type=int, default=2000, help='查询次数（无索引时自动减少）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, with_indexes in (("无索引", False), ("有索引", True)):
+            build_start = time.perf_counter()
+            conn = build_database(os.path.join(tmp, f"{with_indexes}.db"), args.rows, with_indexes)
+            build_time = time.perf_counter() - build_start
+
+            lookups = args.lookups if with_indexes else max(20, args.lookups // 100)
+            timings, plan = run(conn, lookups)
+            conn.close()
+
+            p50 = timings[len(timings) // 2] * 1000
+            p99 = timings[int(len(timings) * 0.99) - 1] * 1000
+            print(f"{label}: {args.rows:,} 条记录, 建库 {build_time:.1f}s, "
+                  f"查询 {lookups} 次 p50={p50:.3f}ms p99={p99:.3f}ms | {plan}")
+
+
+if __name__ == '__main__':
+    main()
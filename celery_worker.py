@@ -0,0 +1,9 @@
+"""
+Celery worker 入口
+
+启动: celery -A celery_worker.celery worker --loglevel=info
+"""
+from app import create_app, celery
+
+app = create_app()
+app.app_context().push()
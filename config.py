@@ -11,16 +11,88 @@ DEBUG = True
 SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(BASE_DIR, 'instance', 'material.db')
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+# SQLite连接参数，每个新连接都会执行（WAL: 读写并发；busy_timeout: 写锁等待毫秒数）
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,  # 负数表示KB，约64MB
+}
+
 # Redis配置
 REDIS_URL = "redis://localhost:6379/0"
 
+# 借用/归还接口幂等键（Idempotency-Key）缓存: memory=进程内LRU（只在单个进程内去重）, redis=多worker共享
+IDEMPOTENCY_BACKEND = "memory"
+IDEMPOTENCY_TTL = 24 * 3600
+IDEMPOTENCY_MAX_ENTRIES = 10000
+# 同一幂等键的请求正在执行时：占用的最长秒数（进程崩溃后自动释放）、后到请求最多等待的秒数及轮询间隔
+IDEMPOTENCY_INFLIGHT_TTL = 30
+IDEMPOTENCY_WAIT = 10.0
+IDEMPOTENCY_POLL_INTERVAL = 0.05
+
+# 物资状态缓存：多worker部署时，最多间隔多少秒检查一次其他进程的修改
+MATERIAL_CACHE_CHECK_INTERVAL = 1.0
+# /api/events 推送：检查其他worker修改的间隔、心跳间隔、单个连接最长保持秒数（之后浏览器自动重连）、可补发的事件数
+SSE_POLL_INTERVAL = 2.0
+SSE_KEEPALIVE = 15.0
+SSE_MAX_DURATION = 300.0
+SSE_HISTORY = 100
+# 预渲染的扫码页缓存条数（每件物资一条）
+PAGE_CACHE_SIZE = 5000
+
 # Celery配置
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_TIMEZONE = "Asia/Shanghai"
+# 设为True时任务在Web进程内同步执行（测试/无Redis的开发环境），生产环境由worker异步执行
+CELERY_TASK_ALWAYS_EAGER = False
+# 连接代理的超时时间（秒），避免Redis不可用时阻塞借用请求
+CELERY_BROKER_CONNECTION_TIMEOUT = 3
 
 # 飞书机器人配置（先去飞书开放平台创建机器人获取）
 FEISHU_WEBHOOK_URL = "https://open.feishu.cn/open-apis/bot/v2/hook/你的webhook令牌"
 
 # 应用配置
-QR_CODE_DIR = os.path.join(BASE_DIR, 'static', 'qrcodes')
\ No newline at end of file
+# 二维码中的公开地址（如 http://wdr.example.com）；配置后换网络不必重新生成、重新打印二维码，None时使用本机IP
+PUBLIC_BASE_URL = None
+QR_CODE_DIR = os.path.join(BASE_DIR, 'static', 'qrcodes')
+# 批量生成二维码的最大进程数（不超过CPU核数）
+QR_MAX_WORKERS = 4
+# 保留状态可查询的二维码刷新任务数
+QR_JOB_HISTORY = 20
+# /qr/<id>.png 按需渲染：内存中缓存的二维码数，以及可选的磁盘缓存目录（None时只缓存在内存）
+QR_CACHE_SIZE = 2000
+QR_DISK_CACHE_DIR = None
+# 二维码图片格式：PNG默认每个模块的像素数（可用 ?scale= 覆盖，1为最小）及上限；打印页使用的格式（svg 或 png）
+QR_PNG_SCALE = 10
+QR_PNG_MAX_SCALE = 20
+QR_PRINT_FORMAT = 'svg'
+
+# A4标签页（/labels.pdf）：分辨率、每页列数和行数、页边距(mm)、中文字体路径（None时自动查找系统字体）
+LABEL_DPI = 300
+LABEL_COLUMNS = 4
+LABEL_ROWS = 6
+LABEL_MARGIN_MM = 10
+LABEL_FONT_PATH = None
+
+# 批量借用/归还单次最多物资数
+BATCH_MAX_ITEMS = 50
+
+# /api/materials 分页：默认每页条数和最大每页条数
+MATERIALS_PAGE_SIZE = 50
+MATERIALS_MAX_PAGE_SIZE = 500
+# 流式导出时每批从数据库读取的行数
+EXPORT_BATCH_SIZE = 500
+
+# 响应压缩：gzip级别(1-9)、brotli级别(0-11，需 pip install brotli)、小于该字节数不压缩、压缩结果缓存条数
+COMPRESS_ENABLED = True
+COMPRESS_LEVEL = 6
+COMPRESS_BR_LEVEL = 5
+COMPRESS_MIN_SIZE = 500
+COMPRESS_CACHE_SIZE = 256
+
+# /debug 借用记录分页：默认每页条数和最大每页条数
+DEBUG_RECORDS_PAGE_SIZE = 20
+DEBUG_RECORDS_MAX_PAGE_SIZE = 500
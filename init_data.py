@@ -9,7 +9,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app import create_app, db
 from app.models import Material
-from app.utils.qr_generator import generate_qr_code
+from app.utils.qr_generator import refresh_qr_codes, resolve_base_url
 
 
 def init_materials():
@@ -52,9 +52,7 @@ def init_materials():
         all_materials = Material.query.all()
         print(f"🔄 开始为 {len(all_materials)} 个物资生成二维码...")
 
-        for material in all_materials:
-            qr_filename = generate_qr_code(material.id, material.name)
-            material.qr_code = qr_filename
+        refresh_qr_codes(all_materials, resolve_base_url(app.config), app.config['QR_CODE_DIR'], max_workers=app.config.get('QR_MAX_WORKERS'))
 
         db.session.commit()
         print("🎉 物资数据初始化完成！")
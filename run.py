@@ -1,30 +1,19 @@
+import os
 import socket
-from app import create_app, db
-from app.models import Material
+from app import create_app
 
-
-def update_qrcodes_with_current_ip():
-    """每次启动时更新二维码为当前IP"""
-    app = create_app()
-    with app.app_context():
-        current_ip = socket.gethostbyname(socket.gethostname())
-        materials = Material.query.all()
-
-        for material in materials:
-            from app.utils.qr_generator import generate_qr_code
-            qr_filename = generate_qr_code(material.id, material.name, f"http://{current_ip}:5000")
-            material.qr_code = qr_filename
-
-        db.session.commit()
-        print(f"✅ 二维码已更新为当前IP: {current_ip}")
+DEBUG = True
 
 
 if __name__ == '__main__':
-    # 每次启动都更新二维码
-    update_qrcodes_with_current_ip()
-
     app = create_app()
     current_ip = socket.gethostbyname(socket.gethostname())
 
+    # 二维码在后台刷新，服务立即开始接受请求；进度见 /api/qrcodes/status，
+    # 刷新完成前的二维码请求按需渲染。调试模式下只在重载器启动的子进程中提交，避免刷新两次
+    if not DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        app.extensions['qr_jobs'].submit()
+        print("🔄 二维码正在后台刷新，进度: /api/qrcodes/status")
+
     print(f"🚀 系统已启动: http://{current_ip}:5000")
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=DEBUG)
@@ -17,14 +17,23 @@ def generate_random_qr_code():
 
 
 @pytest.fixture(scope='session')
-def app():
+def app(tmp_path_factory):
     """创建测试应用"""
-    app = create_app()
-    app.config.update({
+    # 二维码文件和磁盘缓存写到临时目录，测试不在工作区留下文件
+    qr_root = tmp_path_factory.mktemp('qrcodes')
+    app = create_app({
         'TESTING': True,
         'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
         'SQLALCHEMY_TRACK_MODIFICATIONS': False,
-        'WTF_CSRF_ENABLED': False
+        'WTF_CSRF_ENABLED': False,
+        # 测试中直接用数据库修改物资，每次读取都检查库存版本
+        'MATERIAL_CACHE_CHECK_INTERVAL': 0,
+        # Celery任务在进程内同步执行，测试无需Redis
+        'CELERY_TASK_ALWAYS_EAGER': True,
+        'CELERY_BROKER_URL': 'memory://',
+        'CELERY_RESULT_BACKEND': 'cache+memory://',
+        'QR_CODE_DIR': str(qr_root / 'files'),
+        'QR_DISK_CACHE_DIR': str(qr_root / 'cache')
     })
 
     with app.app_context():
@@ -33,6 +42,20 @@ def app():
         _db.drop_all()
 
 
+@pytest.fixture(autouse=True)
+def feishu_sent(monkeypatch):
+    """所有测试都不真正调用飞书接口：记录下本应发送的通知，eager模式的Celery任务照常执行"""
+    from types import SimpleNamespace
+    from app.utils.feishu_service import feishu_notifier
+
+    sent = SimpleNamespace(borrow=[], batch=[])
+    monkeypatch.setattr(feishu_notifier, 'send_borrow_notification', lambda *args: sent.borrow.append(args) or True)
+    monkeypatch.setattr(
+        feishu_notifier, 'send_batch_borrow_notification', lambda *args: sent.batch.append(args) or True
+    )
+    return sent
+
+
 @pytest.fixture
 def client(app):
     """测试客户端"""
@@ -0,0 +1,81 @@
+import json
+import threading
+
+import pytest
+
+from app import create_app, db as _db
+from app.models import Material, BorrowRecord
+
+THREADS = 200
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    """使用文件数据库的独立应用，让多个线程真正并发地写入"""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'stress.db'),
+        'CELERY_TASK_ALWAYS_EAGER': True,
+        'CELERY_BROKER_URL': 'memory://',
+        'CELERY_RESULT_BACKEND': 'cache+memory://'
+    })
+    with app.app_context():
+        material = Material(name="并发测试电机", category="电机", qr_code="stress_qr.png")
+        _db.session.add(material)
+        _db.session.commit()
+        app.config['STRESS_MATERIAL_ID'] = material.id
+    yield app
+    with app.app_context():
+        _db.session.remove()
+        _db.engine.dispose()
+
+
+def _fire(app, url, payloads):
+    """所有线程在同一时刻发出请求，返回各自的状态码"""
+    barrier = threading.Barrier(len(payloads))
+    codes = [None] * len(payloads)
+
+    def worker(i):
+        client = app.test_client()
+        barrier.wait()
+        response = client.post(url, data=json.dumps(payloads[i]), content_type='application/json')
+        codes[i] = response.status_code
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(payloads))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return codes
+
+
+class TestConcurrentBorrow:
+    """并发借用/归还测试"""
+
+    def test_concurrent_borrow_only_one_succeeds(self, file_app):
+        """数百个请求同时借用同一物资，只有一个成功"""
+        material_id = file_app.config['STRESS_MATERIAL_ID']
+        payloads = [{"borrower": f"用户{i}", "student_id": f"2024{i:04d}"} for i in range(THREADS)]
+
+        codes = _fire(file_app, f'/api/borrow/{material_id}', payloads)
+
+        assert codes.count(200) == 1
+        assert codes.count(400) == THREADS - 1
+        with file_app.app_context():
+            assert BorrowRecord.query.filter_by(material_id=material_id).count() == 1
+            assert _db.session.get(Material, material_id).status == 'borrowed'
+
+    def test_concurrent_return_only_one_succeeds(self, file_app):
+        """同一借用人重复提交归还，只关闭一次借用记录"""
+        material_id = file_app.config['STRESS_MATERIAL_ID']
+        borrower = {"borrower": "测试用户", "student_id": "20240001"}
+        client = file_app.test_client()
+        assert client.post(f'/api/borrow/{material_id}', json=borrower).status_code == 200
+
+        codes = _fire(file_app, f'/api/return/{material_id}', [borrower] * 50)
+
+        assert codes.count(200) == 1
+        with file_app.app_context():
+            record = BorrowRecord.query.filter_by(material_id=material_id).one()
+            assert record.status == 'returned'
+            assert _db.session.get(Material, material_id).status == 'available'
@@ -59,4 +59,17 @@ class TestBorrowRecordModel:
         """使用fixture测试借用记录"""
         assert sample_borrow_record.id is not None
         assert sample_borrow_record.borrower == "测试用户"
-        assert sample_borrow_record.status == 'borrowed'
\ No newline at end of file
+        assert sample_borrow_record.status == 'borrowed'
+
+    def test_only_one_open_borrow_per_material(self, db, sample_borrow_record):
+        """同一物资不能同时存在两条未归还的借用记录"""
+        from sqlalchemy.exc import IntegrityError
+
+        db.session.add(BorrowRecord(
+            material_id=sample_borrow_record.material_id,
+            borrower="另一个用户",
+            student_id="20240002"
+        ))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
@@ -1,5 +1,6 @@
 import pytest
 import json
+import uuid
 from app.models import Material
 
 
@@ -42,4 +43,683 @@ class TestMaterialRoutes:
 
         assert response.status_code == 400
         data = json.loads(response.data)
-        assert 'error' in data
\ No newline at end of file
+        assert 'error' in data
+
+
+class TestBatchRoutes:
+    """批量借用/归还测试"""
+
+    @pytest.fixture
+    def kit(self, db):
+        """一整套比赛用物资"""
+        from tests.conftest import generate_random_qr_code
+        materials = [
+            Material(name=f"套件物资{i}", category="电机", qr_code=generate_random_qr_code())
+            for i in range(3)
+        ]
+        db.session.add_all(materials)
+        db.session.commit()
+        return [m.id for m in materials]
+
+    def test_batch_borrow_and_return(self, client, kit, feishu_sent):
+        """整套借用后整套归还，只发送一条合并通知"""
+        user = {"borrower": "测试用户", "student_id": "20240001"}
+
+        response = client.post('/api/borrow/batch', json={"material_ids": kit, **user})
+        assert response.status_code == 200
+        assert len(json.loads(response.data)['data']['materials']) == 3
+        assert len(feishu_sent.batch) == 1
+        assert len(feishu_sent.batch[0][0]) == 3
+
+        response = client.post('/api/return/batch', json={"material_ids": kit, **user})
+        assert response.status_code == 200
+        assert json.loads(response.data)['success'] is True
+
+    def test_batch_borrow_is_all_or_nothing(self, client, kit, feishu_sent):
+        """任意一件不可用时整批失败，其余物资保持可用"""
+        client.post(f'/api/borrow/{kit[1]}', json={"borrower": "别人", "student_id": "20240002"})
+
+        response = client.post('/api/borrow/batch', json={
+            "material_ids": kit, "borrower": "测试用户", "student_id": "20240001"
+        })
+
+        assert response.status_code == 400
+        statuses = {m['id']: m['status'] for m in json.loads(client.get('/api/materials').data)['data']}
+        assert statuses[kit[0]] == 'available'
+        assert statuses[kit[2]] == 'available'
+        assert feishu_sent.batch == []
+
+    @pytest.mark.parametrize('body', [
+        [1, 2, 3],
+        "借用",
+        {"material_ids": [1], "borrower": 123},
+        {"material_ids": [1], "borrower": "测试用户", "student_id": 20240001},
+    ])
+    def test_malformed_body_rejected(self, client, body):
+        """非对象的JSON或非字符串的姓名/学号返回400，而不是500"""
+        for path in ('/api/borrow/batch', '/api/return/batch'):
+            response = client.post(path, json=body)
+            assert response.status_code == 400
+            assert 'error' in response.get_json()
+
+    def test_batch_return_requires_same_borrower(self, client, kit):
+        """批量归还需验证身份"""
+        client.post('/api/borrow/batch', json={
+            "material_ids": kit, "borrower": "测试用户", "student_id": "20240001"
+        })
+
+        response = client.post('/api/return/batch', json={
+            "material_ids": kit, "borrower": "冒名者", "student_id": "20249999"
+        })
+
+        assert response.status_code == 403
+
+    def test_batch_missing_material(self, client, kit):
+        """包含不存在的物资ID"""
+        response = client.post('/api/borrow/batch', json={
+            "material_ids": kit + [999999], "borrower": "测试用户"
+        })
+
+        assert response.status_code == 404
+
+
+class TestIdempotency:
+    """幂等键测试"""
+
+    def test_replayed_borrow_returns_original_response(self, client, sample_material):
+        """同一幂等键重复借用，返回第一次的成功结果"""
+        headers = {'Idempotency-Key': f'borrow-{sample_material.id}-retry'}
+        payload = {"borrower": "测试用户", "student_id": "20240001"}
+
+        first = client.post(f'/api/borrow/{sample_material.id}', json=payload, headers=headers)
+        second = client.post(f'/api/borrow/{sample_material.id}', json=payload, headers=headers)
+
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert second.data == first.data
+        assert second.headers.get('Idempotent-Replayed') == 'true'
+
+    def test_without_key_second_borrow_fails(self, client, sample_material):
+        """不带幂等键时重复借用按正常流程报不可用"""
+        payload = {"borrower": "测试用户", "student_id": "20240001"}
+
+        client.post(f'/api/borrow/{sample_material.id}', json=payload)
+        second = client.post(f'/api/borrow/{sample_material.id}', json=payload)
+
+        assert second.status_code == 400
+
+    def test_failed_request_is_not_cached(self, client, sample_material):
+        """失败的请求不缓存，修正输入后可用同一幂等键重试"""
+        headers = {'Idempotency-Key': f'borrow-{sample_material.id}-fix'}
+
+        first = client.post(f'/api/borrow/{sample_material.id}', json={}, headers=headers)
+        second = client.post(f'/api/borrow/{sample_material.id}', json={"borrower": "测试用户"}, headers=headers)
+
+        assert first.status_code == 400
+        assert second.status_code == 200
+
+    def test_waits_for_inflight_request(self, app, client, sample_material):
+        """同一幂等键的请求正在执行（可能在另一个worker）时，等待并重放它的结果，而不是再执行一次"""
+        import threading
+        headers = {'Idempotency-Key': f'borrow-{sample_material.id}-inflight'}
+        store = app.extensions['idempotency']
+        scoped_key = f"POST:/api/borrow/{sample_material.id}:{headers['Idempotency-Key']}"
+        assert store.reserve(scoped_key, 30)
+
+        result = {'status': 200, 'body': '{"success": true}', 'mimetype': 'application/json'}
+        threading.Timer(0.2, store.set, (scoped_key, result)).start()
+
+        response = client.post(f'/api/borrow/{sample_material.id}', json={"borrower": "测试用户"}, headers=headers)
+        assert response.status_code == 200
+        assert response.get_json() == {"success": True}
+        assert response.headers.get('Idempotent-Replayed') == 'true'
+        # 物资没有被第二次借出
+        from app.utils.material_cache import get_material_cache
+        assert get_material_cache().get(sample_material.id).status == 'available'
+
+
+class TestMemoryIdempotencyStore:
+    """进程内幂等存储测试"""
+
+    def test_lru_eviction_and_ttl(self):
+        from app.utils.idempotency import MemoryIdempotencyStore
+
+        store = MemoryIdempotencyStore(max_entries=2, ttl=60)
+        store.set('a', 1)
+        store.set('b', 2)
+        store.get('a')
+        store.set('c', 3)
+        assert store.get('b') is None
+        assert store.get('a') == 1
+
+        expired = MemoryIdempotencyStore(ttl=-1)
+        expired.set('a', 1)
+        assert expired.get('a') is None
+
+    def test_reserve_and_release(self):
+        from app.utils.idempotency import MemoryIdempotencyStore
+
+        store = MemoryIdempotencyStore()
+        assert store.reserve('a', 30)
+        assert not store.reserve('a', 30)
+        store.release('a')
+        assert store.reserve('a', 30)
+        assert MemoryIdempotencyStore().reserve('b', -1)
+
+
+class TestConditionalGet:
+    """ETag / 304 测试"""
+
+    def test_materials_not_modified(self, client, sample_material):
+        """库存未变化时返回304"""
+        first = client.get('/api/materials')
+        etag = first.headers['ETag']
+        assert first.headers.get('Last-Modified')
+
+        second = client.get('/api/materials', headers={'If-None-Match': etag})
+        assert second.status_code == 304
+        assert second.data == b''
+
+    def test_etag_changes_after_borrow(self, client, sample_material):
+        """借用后库存版本递增，旧ETag失效"""
+        etag = client.get(f'/scan/{sample_material.id}').headers['ETag']
+
+        client.post(f'/api/borrow/{sample_material.id}', json={"borrower": "测试用户"})
+
+        response = client.get(f'/scan/{sample_material.id}', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert '已借出' in response.get_data(as_text=True)
+
+    def test_if_modified_since_ignored(self, client, sample_material):
+        """同一秒内的修改Last-Modified不变，只带If-Modified-Since时不能返回304"""
+        last_modified = client.get('/api/materials').headers['Last-Modified']
+
+        client.post(f'/api/borrow/{sample_material.id}', json={"borrower": "测试用户"})
+
+        response = client.get('/api/materials', headers={'If-Modified-Since': last_modified})
+        assert response.status_code == 200
+
+
+class TestMaterialFilters:
+    """物资列表筛选与分页测试"""
+
+    @pytest.fixture
+    def catalogue(self, db):
+        from tests.conftest import generate_random_qr_code
+        category = f"分页类_{uuid.uuid4().hex[:8]}"
+        materials = [
+            Material(name=f"分页测试{i:02d}", category=category, qr_code=generate_random_qr_code())
+            for i in range(5)
+        ]
+        materials[0].status = 'maintenance'
+        db.session.add_all(materials)
+        db.session.commit()
+        return materials
+
+    def test_keyset_pagination(self, client, catalogue):
+        """按游标逐页读取，覆盖全部结果且不重复"""
+        seen = []
+        cursor = None
+        while True:
+            url = f'/api/materials?category={catalogue[0].category}&limit=2' + (f'&cursor={cursor}' if cursor else '')
+            data = json.loads(client.get(url).data)
+            assert len(data['data']) <= 2
+            seen.extend(m['id'] for m in data['data'])
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+
+        assert seen == sorted(m.id for m in catalogue)
+
+    def test_filters(self, client, catalogue):
+        """状态筛选和名称前缀筛选"""
+        category = catalogue[0].category
+        data = json.loads(client.get(f'/api/materials?category={category}&status=maintenance').data)
+        assert [m['id'] for m in data['data']] == [catalogue[0].id]
+
+        data = json.loads(client.get(f'/api/materials?category={category}&prefix=分页测试0&limit=10').data)
+        assert len(data['data']) == 5
+
+        data = json.loads(client.get('/api/materials?prefix=分页_').data)
+        assert data['data'] == []
+
+    def test_admin_renders_first_page(self, client, catalogue):
+        """管理页面只渲染第一页，并给出继续加载的游标"""
+        category = catalogue[0].category
+        html = client.get(f'/admin?category={category}&limit=2').get_data(as_text=True)
+
+        assert '分页测试00' in html and '分页测试01' in html
+        assert '分页测试02' not in html
+        assert f'data-next-cursor="{catalogue[1].id}"' in html
+
+    def test_admin_status_filter(self, client, catalogue):
+        category = catalogue[0].category
+        html = client.get(f'/admin?category={category}&status=maintenance').get_data(as_text=True)
+
+        assert '分页测试00' in html
+        assert '分页测试01' not in html
+
+    def test_invalid_limit(self, client):
+        response = client.get('/api/materials?limit=abc')
+        assert response.status_code == 400
+
+
+class TestExport:
+    """流式导出测试"""
+
+    def test_export_ndjson(self, client, sample_material):
+        """每行一个物资，与列表接口内容一致"""
+        response = client.get('/api/materials/export')
+
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.mimetype == 'application/x-ndjson'
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert rows == json.loads(client.get('/api/materials').data)['data']
+
+    def test_list_stream_param(self, client, sample_material):
+        """/api/materials?stream=1 与导出接口相同"""
+        response = client.get(f'/api/materials?stream=1&prefix={sample_material.name}')
+
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert sample_material.id in [row['id'] for row in rows]
+        assert all(row['name'].startswith(sample_material.name) for row in rows)
+
+
+class TestPages:
+    """页面模板渲染测试"""
+
+    def test_pages_render(self, client, sample_material):
+        """各页面正常渲染并显示物资名称"""
+        for path in ('/admin', f'/borrow/{sample_material.id}', f'/scan/{sample_material.id}',
+                     f'/qrinfo/{sample_material.id}', f'/return/{sample_material.id}', '/debug'):
+            response = client.get(path)
+            assert response.status_code == 200, path
+            assert sample_material.name in response.get_data(as_text=True)
+
+    def test_material_name_is_escaped(self, client, db):
+        """物资名称中的HTML会被转义"""
+        material = Material(name='<b>舵机</b>', category='舵机', qr_code=f"{uuid.uuid4().hex}.png")
+        db.session.add(material)
+        db.session.commit()
+
+        html = client.get(f'/scan/{material.id}').get_data(as_text=True)
+        assert '&lt;b&gt;舵机&lt;/b&gt;' in html
+        assert '<b>舵机</b>' not in html
+
+    def test_missing_material_404(self, client):
+        response = client.get('/scan/999999')
+        assert response.status_code == 404
+
+
+class TestDebugRecords:
+    """/debug 借用记录查询测试"""
+
+    @pytest.fixture
+    def history(self, db):
+        from datetime import datetime
+        from tests.conftest import generate_random_qr_code
+        from app.models import BorrowRecord
+
+        # 放在远未来的时间段，避免与其他测试的记录混在一起；结束后删除
+        materials = [Material(name=f"历史物资{i}", category="历史", qr_code=generate_random_qr_code()) for i in range(5)]
+        db.session.add_all(materials)
+        db.session.flush()
+        records = [
+            BorrowRecord(material_id=materials[i % 5].id, borrower=f"借用人{i}", status='returned',
+                         borrow_time=datetime(2099, 1, 1 + i, 10, 0))
+            for i in range(10)
+        ]
+        db.session.add_all(records)
+        db.session.commit()
+        yield records
+
+        for record in records:
+            db.session.delete(record)
+        db.session.commit()
+
+    def test_records_loaded_with_material_in_one_query(self, client, db, history):
+        """记录数增加不会增加查询次数"""
+        from sqlalchemy import event
+
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            if 'borrow_record' in statement:
+                statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            html = client.get('/debug?since=2099-01-01&limit=10').get_data(as_text=True)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+
+        assert len(statements) == 1
+        assert 'JOIN material' in statements[0]
+        assert html.count('历史物资') >= 10
+
+    def test_date_range_and_pagination(self, client, history):
+        html = client.get('/debug?since=2099-01-03&until=2099-01-06&limit=3').get_data(as_text=True)
+        assert '借用人5' in html and '借用人3' in html
+        assert '借用人2' not in html and '借用人6' not in html
+        assert 'page=2' in html
+
+        html = client.get('/debug?since=2099-01-03&until=2099-01-06&limit=3&page=2').get_data(as_text=True)
+        assert '借用人2' in html
+        assert '借用人3' not in html
+
+    def test_invalid_date(self, client):
+        response = client.get('/debug?since=2099/01/01')
+        assert response.status_code == 400
+
+
+class TestAssets:
+    """带哈希的静态资源测试"""
+
+    def test_page_links_hashed_asset(self, client, sample_material):
+        """页面引用带哈希的CSS，资源以 immutable 长期缓存"""
+        import re
+
+        html = client.get(f'/scan/{sample_material.id}').get_data(as_text=True)
+        url = re.search(r'href="(/assets/css/scan\.[0-9a-f]{10}\.css)"', html).group(1)
+
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.mimetype == 'text/css'
+        assert response.cache_control.immutable
+        assert response.cache_control.max_age == 365 * 24 * 3600
+
+    def test_stale_hash_404(self, client):
+        response = client.get('/assets/css/scan.0000000000.css')
+        assert response.status_code == 404
+
+
+class TestCompression:
+    """响应压缩测试"""
+
+    def test_gzip_html(self, client, sample_material):
+        import gzip
+
+        plain = client.get('/admin')
+        response = client.get('/admin', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert gzip.decompress(response.data) == plain.data
+        assert len(response.data) < len(plain.data)
+        assert response.headers['ETag'] == plain.headers['ETag']
+
+    def test_not_compressed_without_accept_encoding(self, client, sample_material):
+        response = client.get('/admin', headers={'Accept-Encoding': 'identity'})
+        assert 'Content-Encoding' not in response.headers
+
+    def test_small_response_not_compressed(self, client):
+        response = client.get('/api/materials?limit=abc', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+
+    def test_stream_not_compressed(self, client, sample_material):
+        response = client.get('/api/materials/export', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+
+    def test_compressed_body_cached_by_etag(self, client, sample_material, monkeypatch):
+        """内容不变时复用缓存的压缩结果"""
+        import gzip
+        from app.utils import compression
+
+        calls = []
+        original = compression.compress
+
+        def counting(data, encoding, level):
+            calls.append(encoding)
+            return original(data, encoding, level)
+
+        monkeypatch.setattr(compression, 'compress', counting)
+        first = client.get('/admin', headers={'Accept-Encoding': 'gzip'})
+        second = client.get('/admin', headers={'Accept-Encoding': 'gzip'})
+
+        assert calls == ['gzip']
+        assert gzip.decompress(second.data) == gzip.decompress(first.data)
+
+
+class TestMaterialEvents:
+    """物资状态推送（SSE）测试"""
+
+    def test_replays_changes_since_version(self, app, client, sample_material, monkeypatch):
+        """从页面渲染时的版本开始补发之后的变化"""
+        from app.utils.material_cache import get_material_cache
+
+        monkeypatch.setitem(app.config, 'SSE_MAX_DURATION', 0.2)
+        monkeypatch.setitem(app.config, 'SSE_POLL_INTERVAL', 0.05)
+        version = get_material_cache().version()
+
+        client.post(f'/api/borrow/{sample_material.id}', json={"borrower": "测试用户"})
+
+        response = client.get(f'/api/events?since={version}')
+        assert response.mimetype == 'text/event-stream'
+        blocks = [b for b in response.get_data(as_text=True).split('\n\n') if 'event: material' in b]
+        assert len(blocks) == 1
+
+        lines = dict(line.split(': ', 1) for line in blocks[0].splitlines())
+        event = json.loads(lines['data'])
+        assert int(lines['id']) == event['version'] > version
+        material = next(m for m in event['materials'] if m['id'] == sample_material.id)
+        assert material['status'] == 'borrowed'
+        assert material['current_holder'] == "测试用户"
+
+        # 带上最后收到的事件ID重连，不再重复推送
+        response = client.get('/api/events', headers={'Last-Event-ID': lines['id']})
+        assert 'event: material' not in response.get_data(as_text=True)
+
+    def test_resync_when_history_lost(self):
+        """错过的事件超出保留范围时要求页面重新加载"""
+        from app.utils.material_events import MaterialEventHub
+
+        hub = MaterialEventHub(history=2)
+        hub._version, hub._base = 10, 10
+        for version in (11, 12, 13):
+            hub._record(version, [], [version], {})
+            hub._version = version
+
+        assert hub.events_since(10) is None
+        assert [v for v, _ in hub.events_since(11)] == [12, 13]
+        assert hub.events_since(13) == []
+
+
+class TestLabelSheets:
+    """A4标签页测试"""
+
+    def test_pdf_and_png_pages(self, client, sample_material):
+        response = client.get('/labels.pdf')
+        assert response.status_code == 200
+        assert response.mimetype == 'application/pdf'
+        assert response.data.startswith(b'%PDF')
+
+        response = client.get('/labels/1.png')
+        assert response.status_code == 200
+        assert response.data.startswith(b'\x89PNG')
+
+        assert client.get('/labels/9999.png').status_code == 404
+
+    def test_cached_by_inventory_version(self, client, sample_material, monkeypatch):
+        """库存版本不变时不重新拼版，变化后重新拼版"""
+        from app.utils import label_sheet
+
+        calls = []
+        original = label_sheet.render_pages
+
+        def counting(*args):
+            calls.append(1)
+            return original(*args)
+
+        monkeypatch.setattr(label_sheet, 'render_pages', counting)
+        first = client.get('/labels.pdf').data
+        assert client.get('/labels.pdf').data == first
+        assert len(calls) == 1
+
+        client.post(f'/api/borrow/{sample_material.id}', json={"borrower": "测试用户"})
+        client.get('/labels.pdf')
+        assert len(calls) == 2
+
+
+class TestQRImages:
+    """按需渲染的二维码图片测试"""
+
+    def test_png_with_strong_etag(self, client, sample_material):
+        response = client.get(f'/qr/{sample_material.id}.png')
+        assert response.status_code == 200
+        assert response.mimetype == 'image/png'
+        assert response.data.startswith(b'\x89PNG')
+
+        etag, weak = response.get_etag()
+        assert etag and not weak
+
+        response = client.get(f'/qr/{sample_material.id}.png', headers={'If-None-Match': f'"{etag}"'})
+        assert response.status_code == 304
+
+    def test_svg_and_scale(self, client, sample_material):
+        response = client.get(f'/qr/{sample_material.id}.svg')
+        assert response.status_code == 200
+        assert response.mimetype == 'image/svg+xml'
+
+        small = client.get(f'/qr/{sample_material.id}.png?scale=1')
+        assert small.status_code == 200
+        assert small.get_etag() != client.get(f'/qr/{sample_material.id}.png').get_etag()
+        assert client.get(f'/qr/{sample_material.id}.png?scale=0').status_code == 400
+
+    def test_unknown_material(self, client):
+        assert client.get('/qr/999999.png').status_code == 404
+        assert client.get('/qr/1.gif').status_code == 404
+
+
+class TestShortLinks:
+    """二维码短码测试"""
+
+    def test_short_code_assigned(self, sample_material):
+        from app.models import SHORT_CODE_ALPHABET, SHORT_CODE_LENGTH
+        code = sample_material.short_code
+        assert len(code) == SHORT_CODE_LENGTH
+        assert set(code) <= set(SHORT_CODE_ALPHABET)
+
+    def test_resolves_to_scan_page(self, client, sample_material):
+        for path in (f'/S/{sample_material.short_code}', f'/s/{sample_material.short_code.lower()}'):
+            response = client.get(path)
+            assert response.status_code == 200
+            assert sample_material.name in response.get_data(as_text=True)
+
+        assert client.get('/s/ZZZZZZZZ').status_code == 404
+
+
+class TestQRRefreshJobs:
+    """后台二维码刷新任务测试"""
+
+    @pytest.fixture
+    def materials(self, app):
+        from app import db
+        items = [Material(name=f"刷新测试{i}", category="电机") for i in range(3)]
+        db.session.add_all(items)
+        db.session.commit()
+        yield items
+        for item in items:
+            db.session.delete(item)
+        db.session.commit()
+
+    def test_background_refresh_progress(self, app, client, materials):
+        job = app.extensions['qr_jobs'].submit()
+        assert job.wait(30)
+
+        status = client.get('/api/qrcodes/status').get_json()
+        assert status['job_id'] == job.id
+        assert status['status'] == 'done'
+        assert status['done'] == status['total'] >= len(materials)
+        assert status['errors'] == []
+
+        # 没有变化时再次刷新：total 仍为全部物资，不需要重新生成
+        job = app.extensions['qr_jobs'].submit()
+        assert job.wait(30)
+        again = client.get('/api/qrcodes/status').get_json()
+        assert again['total'] == status['total']
+        assert again['done'] == again['total']
+        assert again['regenerated'] == 0
+
+        from app import db
+        db.session.expire_all()
+        response = client.get(f'/qrcodes/{materials[0].qr_code}')
+        assert response.status_code == 200
+        response.close()
+
+    def test_missing_file_rendered_on_demand(self, client, sample_material):
+        response = client.get(f'/qrcodes/material_{sample_material.id}_not_generated_yet.png')
+        assert response.status_code == 200
+        assert response.data.startswith(b'\x89PNG')
+
+        assert client.get('/qrcodes/unknown.png').status_code == 404
+
+    def test_stale_file_rendered_on_demand(self, app, client, sample_material):
+        """磁盘上残留的旧命名二维码文件不再直接返回，而是按当前编码内容渲染"""
+        import os
+        from app.utils.qr_images import get_qr_images
+
+        legacy = f"material_{sample_material.id}_{sample_material.name}.png"
+        path = os.path.join(app.config['QR_CODE_DIR'], legacy)
+        os.makedirs(app.config['QR_CODE_DIR'], exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'legacy qr code')
+        try:
+            response = client.get(f'/qrcodes/{legacy}')
+            assert response.status_code == 200
+            assert response.data != b'legacy qr code'
+            with app.test_request_context():
+                _, expected = get_qr_images().get(sample_material, 'png')
+            assert response.data == expected
+        finally:
+            os.remove(path)
+
+    def test_progress_counts_up_to_date_codes(self):
+        """进度按全部物资计数，已是最新的二维码算作已完成"""
+        from app.utils.qr_jobs import QRJob
+
+        job = QRJob()
+        job.start(500)
+        job.progress(1, 3)
+        assert (job.done, job.total, job.stale) == (498, 500, 3)
+        job.progress(3, 3)
+        job.finish(3)
+        assert job.to_dict()['done'] == job.to_dict()['total'] == 500
+
+    def test_generate_qrcodes_returns_job(self, app, client, materials):
+        response = client.post('/api/generate-qrcodes')
+        assert response.status_code == 202
+        data = response.get_json()
+        assert app.extensions['qr_jobs'].get(data['job_id']).wait(30)
+
+        status = client.get(data['status_url']).get_json()
+        assert status['status'] == 'done'
+        assert status['done'] == status['total']
+        assert status['errors'] == []
+
+        assert client.get('/api/qrcodes/jobs/unknown').status_code == 404
+
+    def test_failed_codes_reported(self, app, client, materials, monkeypatch):
+        """单个二维码生成失败时任务继续，失败记入 errors"""
+        from app.utils import qr_generator
+        original = qr_generator.render_qr
+
+        def flaky(data, *args):
+            if data.endswith(materials[0].short_code):
+                raise ValueError('渲染失败')
+            return original(data, *args)
+
+        # 清除已有文件和哈希，迫使全部重新生成
+        from app import db
+        Material.query.update({Material.qr_hash: None})
+        db.session.commit()
+        monkeypatch.setattr(qr_generator, 'render_qr', flaky)
+        monkeypatch.setattr(qr_generator, 'MIN_JOBS_PER_WORKER', 10 ** 6)
+
+        job_id = client.post('/api/generate-qrcodes').get_json()['job_id']
+        assert app.extensions['qr_jobs'].get(job_id).wait(30)
+        status = client.get(f'/api/qrcodes/jobs/{job_id}').get_json()
+        assert status['status'] == 'done'
+        assert status['done'] == status['total']
+        assert status['errors'] == [f"#{materials[0].id}: 渲染失败"]
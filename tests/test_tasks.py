@@ -0,0 +1,34 @@
+import json
+from app.utils.feishu_service import feishu_notifier
+
+
+class TestBorrowNotificationTask:
+    """飞书通知异步任务测试"""
+
+    def test_borrow_enqueues_notification(self, client, sample_material, feishu_sent):
+        """借用成功后通过Celery任务发送通知"""
+        response = client.post(
+            f'/api/borrow/{sample_material.id}',
+            data=json.dumps({"borrower": "测试用户", "student_id": "20240001"}),
+            content_type='application/json'
+        )
+
+        assert response.status_code == 200
+        assert len(feishu_sent.borrow) == 1
+        material_name, borrower, student_id, borrow_time = feishu_sent.borrow[0]
+        assert material_name == sample_material.name
+        assert borrower == "测试用户"
+        assert student_id == "20240001"
+
+    def test_notification_failure_does_not_fail_borrow(self, client, sample_material, monkeypatch):
+        """飞书发送失败时借用仍然成功"""
+        monkeypatch.setattr(feishu_notifier, 'send_borrow_notification', lambda *args: False)
+
+        response = client.post(
+            f'/api/borrow/{sample_material.id}',
+            data=json.dumps({"borrower": "测试用户", "student_id": "20240001"}),
+            content_type='application/json'
+        )
+
+        assert response.status_code == 200
+        assert json.loads(response.data)['success'] is True
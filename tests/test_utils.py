@@ -10,4 +10,247 @@ class TestQRGenerator:
         """测试获取本地IP"""
         ip = get_local_ip()
         assert ip is not None
-        assert isinstance(ip, str)
\ No newline at end of file
+        assert isinstance(ip, str)
+
+    @pytest.mark.parametrize('max_workers', [1, 2])
+    def test_generate_qr_codes(self, tmp_path, monkeypatch, max_workers):
+        """批量生成：每个物资一个PNG，并报告进度"""
+        from collections import namedtuple
+        from PIL import Image
+        from app.utils import qr_generator
+
+        # 强制使用进程池，与运行测试的机器核数无关
+        monkeypatch.setattr(qr_generator, 'MIN_JOBS_PER_WORKER', 1)
+        monkeypatch.setattr(qr_generator.os, 'cpu_count', lambda: 2)
+
+        Item = namedtuple('Item', ['id', 'name'])
+        items = [Item(i, f"物资 {i}") for i in range(1, 6)]
+        progress = []
+
+        filenames = qr_generator.generate_qr_codes(
+            items, 'http://example.com', qr_dir=str(tmp_path), max_workers=max_workers,
+            progress=lambda done, total: progress.append((done, total))
+        )
+
+        assert sorted(filenames) == [1, 2, 3, 4, 5]
+        assert progress[-1] == (5, 5)
+        for filename in filenames.values():
+            with Image.open(tmp_path / filename) as image:
+                assert image.size[0] > 0
+
+    def test_refresh_qr_codes_only_regenerates_changed(self, tmp_path):
+        """内容哈希不变时不重新生成；地址变化或文件丢失时才生成"""
+        from types import SimpleNamespace
+        from app.utils.qr_generator import refresh_qr_codes
+
+        items = [SimpleNamespace(id=i, name=f"物资{i}", qr_code=None, qr_hash=None) for i in (1, 2)]
+        refresh = lambda base_url: refresh_qr_codes(items, base_url, str(tmp_path), progress=None)
+
+        assert refresh('http://a:5000') == 2
+        first = items[0].qr_code
+        assert refresh('http://a:5000') == 0
+
+        os.remove(tmp_path / items[1].qr_code)
+        assert refresh('http://a:5000') == 1
+
+        assert refresh('http://b:5000') == 2
+        assert items[0].qr_code != first
+        assert sorted(os.listdir(tmp_path)) == sorted(item.qr_code for item in items)
+
+
+class TestSQLiteTuning:
+    """SQLite连接调优测试"""
+
+    def test_pragmas_applied_on_connect(self, app):
+        """每个新连接都执行配置中的PRAGMA"""
+        from app import db
+        with app.app_context():
+            busy_timeout = db.session.execute(db.text("PRAGMA busy_timeout")).scalar()
+        assert busy_timeout == app.config['SQLITE_PRAGMAS']['busy_timeout']
+
+    def test_apply_sqlite_pragmas(self, tmp_path):
+        """文件数据库启用WAL"""
+        import sqlite3
+        from app.utils.db_tuning import apply_sqlite_pragmas
+
+        conn = sqlite3.connect(str(tmp_path / 'wal.db'))
+        apply_sqlite_pragmas(conn, {'journal_mode': 'WAL', 'synchronous': 'NORMAL'})
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+        conn.close()
+
+
+class TestMaterialCache:
+    """物资状态缓存测试"""
+
+    def test_hit_does_not_query_database(self, app, sample_material):
+        """缓存命中且未到检查间隔时不访问数据库"""
+        from sqlalchemy import event
+        from app import db
+        from app.utils.material_cache import MaterialCache
+
+        cache = MaterialCache(check_interval=60)
+        assert cache.get(sample_material.id).name == sample_material.name
+
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            assert cache.get(sample_material.id).status == 'available'
+            assert any(m.id == sample_material.id for m in cache.all())
+            cache.all()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        # 仅首次 all() 加载一次全量
+        assert len(statements) == 1
+
+    def test_short_code_lookup_cached(self, app, sample_material):
+        """短码首次走索引查询，之后只查字典"""
+        from sqlalchemy import event
+        from app import db
+        from app.utils.material_cache import MaterialCache
+
+        cache = MaterialCache(check_interval=60)
+        assert cache.get_by_short_code(sample_material.short_code).id == sample_material.id
+        assert cache.get_by_short_code('ZZZZZZ') is None
+
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            assert cache.get_by_short_code(sample_material.short_code).id == sample_material.id
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        assert statements == []
+
+    def test_write_through_on_borrow(self, client, app, sample_material):
+        """借用提交后缓存直接更新为新状态"""
+        from app.utils.material_cache import get_material_cache
+
+        cache = get_material_cache()
+        assert cache.get(sample_material.id).status == 'available'
+
+        client.post(f'/api/borrow/{sample_material.id}', json={"borrower": "测试用户"})
+
+        snapshot = cache.get(sample_material.id)
+        assert snapshot.status == 'borrowed'
+        assert snapshot.current_holder == "测试用户"
+
+    def test_invalidated_by_other_worker(self, db, sample_material):
+        """其他进程修改物资并递增版本后，缓存重新加载"""
+        from sqlalchemy import update
+        from app.models import Material, bump_inventory_version
+        from app.utils.material_cache import MaterialCache
+
+        cache = MaterialCache(check_interval=0)
+        assert cache.get(sample_material.id).status == 'available'
+
+        db.session.execute(update(Material).where(Material.id == sample_material.id).values(status='maintenance'))
+        bump_inventory_version()
+        db.session.commit()
+
+        assert cache.get(sample_material.id).status == 'maintenance'
+
+
+    def test_stale_version_read_ignored(self, app, sample_material, monkeypatch):
+        """与 apply() 并发读到的旧版本号不会让缓存回退或被清空"""
+        from app.utils.material_cache import MaterialCache
+
+        cache = MaterialCache(check_interval=0)
+        version = cache.version()
+        snapshot = cache.get(sample_material.id)
+        cache.apply([sample_material], version + 1)
+
+        read_version = cache._read_version
+        monkeypatch.setattr(cache, '_read_version', lambda: (version, read_version()[1]))
+        assert cache.version() == version + 1
+        assert cache._items[sample_material.id] == snapshot
+
+
+class TestPageCache:
+    """扫码页预渲染缓存测试"""
+
+    def test_scan_page_rendered_once(self, client, sample_material, monkeypatch):
+        """同一状态和库存版本下只渲染一次"""
+        from app import routes
+
+        rendered = []
+        original = routes.render_template
+
+        def counting(name, **context):
+            rendered.append(name)
+            return original(name, **context)
+
+        monkeypatch.setattr(routes, 'render_template', counting)
+        first = client.get(f'/scan/{sample_material.id}')
+        second = client.get(f'/scan/{sample_material.id}')
+
+        assert rendered == ['scan.html']
+        assert first.data == second.data
+
+    def test_invalidated_on_borrow(self, client, sample_material):
+        """借用后扫码页显示归还按钮"""
+        assert '借用此物资' in client.get(f'/scan/{sample_material.id}').get_data(as_text=True)
+
+        client.post(f'/api/borrow/{sample_material.id}', json={"borrower": "测试用户"})
+
+        html = client.get(f'/scan/{sample_material.id}').get_data(as_text=True)
+        assert '归还此物资' in html
+        assert '测试用户' in html
+
+
+class TestQRImageCache:
+    """二维码图片缓存测试"""
+
+    def test_lru_and_disk_tier(self, tmp_path, monkeypatch):
+        """内存命中不重新渲染；内存淘汰后从磁盘读取"""
+        from types import SimpleNamespace
+        from app.utils import qr_images
+
+        renders = []
+        original = qr_images.render_qr
+        monkeypatch.setattr(qr_images, 'render_qr', lambda data, *args: renders.append(data) or original(data, *args))
+
+        first, second = (SimpleNamespace(id=i, short_code=None) for i in (1, 2))
+        cache = qr_images.QRImageCache('http://example.com', max_entries=1, disk_dir=str(tmp_path))
+        digest, png = cache.get(first)
+        assert cache.get(first) == (digest, png)
+        assert len(renders) == 1
+
+        cache.get(second)
+        assert len(cache) == 1
+        assert cache.get(first) == (digest, png)
+        assert len(renders) == 2
+        assert sorted(os.listdir(tmp_path)) == sorted(f"{d}.png" for d in (digest, cache.get(second)[0]))
+
+    def test_compact_formats(self):
+        """1位PNG与逐模块绘制的结果像素一致；scale=1 和 SVG 都小得多"""
+        import io
+        from PIL import Image, ImageChops
+        from app.utils.qr_generator import make_qr_image, render_qr
+
+        data = 'http://192.168.1.100:5000/scan/1'
+        png = render_qr(data)
+        with Image.open(io.BytesIO(png)) as image:
+            assert image.mode == '1'
+            expected = make_qr_image(data).get_image().convert('L')
+            assert ImageChops.difference(image.convert('L'), expected).getbbox() is None
+
+        assert len(render_qr(data, scale=1)) < len(png)
+        svg = render_qr(data, 'svg')
+        assert svg.startswith(b'<svg') and b'viewBox="0 0 33 33"' in svg
+
+    @pytest.mark.parametrize('base_url', ['http://192.168.100.100:5000', 'https://wdr-lab.example.com'])
+    def test_short_code_payload_fits_version_2(self, base_url):
+        """短码地址使用字母数字模式，带IP和端口也不超过版本2"""
+        from app.utils.qr_generator import _make_qr, qr_payload
+
+        data = qr_payload(1, base_url, 'ABC234')
+        assert data.endswith('/S/ABC234')
+        assert _make_qr(data).version <= 2
@@ -5,27 +5,25 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app import create_app, db
 from app.models import Material
-from app.utils.qr_generator import generate_qr_code
+from app.utils.qr_generator import refresh_qr_codes, resolve_base_url
 
 
 def final_fix_qrcodes():
-    """最终修复 - 使用主机名生成二维码"""
+    """最终修复 - 按公开地址和短码重新生成二维码"""
     app = create_app()
 
     with app.app_context():
         materials = Material.query.all()
 
-        print("🔄 使用主机名重新生成二维码...")
+        print("🔄 重新生成二维码...")
 
-        for material in materials:
-            # 不传base_url，让函数自动使用主机名
-            qr_filename = generate_qr_code(material.id, material.name)
-            material.qr_code = qr_filename
-            print(f"✅ 更新: {material.name}")
+        # 使用配置的 PUBLIC_BASE_URL，未配置时使用本机IP
+        regenerated = refresh_qr_codes(materials, resolve_base_url(app.config), app.config['QR_CODE_DIR'], max_workers=app.config.get('QR_MAX_WORKERS'))
+        print(f"🔄 重新生成了 {regenerated}/{len(materials)} 个二维码")
 
         db.session.commit()
         print("🎉 二维码更新完成！")
-        print("💡 现在二维码使用主机名，换网络也能用！")
+        print("💡 在 config.py 中配置 PUBLIC_BASE_URL 后二维码与IP无关，换网络也能用！")
 
 
 if __name__ == '__main__':